@@ -2,33 +2,48 @@
 CLI entrypoint for synthetic depression data generation.
 """
 import argparse
+import asyncio
 import random
 import json
 import os
-from typing import Optional
+from typing import Any, Dict, Optional
 from dotenv import load_dotenv
 
-from agents import set_default_openai_key, Runner, SQLiteSession, ModelSettings
-from synthetic_datagen.generation.profile_generation import sample_patient_profile
+try:
+    import uvloop
+except ImportError:  # uvloop is optional (and not available on Windows)
+    uvloop = None
+
+from agents import set_default_openai_key, Runner, ModelSettings
+from synthetic_datagen.generation.profile_generation import (
+    sample_patient_profile,
+    sample_patient_profile_async,
+    sample_patient_profiles_batch,
+)
 from synthetic_datagen.generation.session_runner import (
     run_patient_doctor_session,
     build_patient_manager_agent,
+    write_details_index,
 )
 from synthetic_datagen.config import (
+    LOG_QUIET,
     LOG_MINIMAL,
     LOG_LIGHT,
     LOG_HEAVY,
     LOG_LEVELS,
     DEFAULT_LOG_LEVEL,
     DEFAULT_NUM_SESSIONS,
+    DEFAULT_CONCURRENCY,
 )
 from synthetic_datagen.generation.manager_logic import (
+    format_conversation_context,
     build_patient_manager_input,
     parse_patient_manager_output,
 )
 from synthetic_datagen.prompts.patient_manager_prompt import PATIENT_MANAGER_SYSTEM_PROMPT
 from synthetic_datagen.prompts.doctor_personas import DOCTOR_PERSONAS, sample_doctor_microstyle
-from synthetic_datagen.utils.io import save_transcript
+from synthetic_datagen.utils.io import save_transcript, JsonlTranscriptWriter
+from synthetic_datagen.utils.openai_client import close_openai_client
 from synthetic_datagen import config
 
 
@@ -56,6 +71,41 @@ def main():
         default=DEFAULT_NUM_SESSIONS,
         help=f"Number of sessions to generate (default: {DEFAULT_NUM_SESSIONS})"
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Maximum number of sessions to generate in parallel (default: {DEFAULT_CONCURRENCY})"
+    )
+    parser.add_argument(
+        "--max-requests-per-minute",
+        type=int,
+        default=config.MAX_REQUESTS_PER_MINUTE,
+        help=f"Request rate limit shared across concurrent sessions (default: {config.MAX_REQUESTS_PER_MINUTE})"
+    )
+    parser.add_argument(
+        "--max-tokens-per-minute",
+        type=int,
+        default=config.MAX_TOKENS_PER_MINUTE,
+        help=f"Token rate limit shared across concurrent sessions (default: {config.MAX_TOKENS_PER_MINUTE})"
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Generate life backgrounds through the OpenAI Batch API (50%% cheaper, up to 24h turnaround); dialogue turns still run live"
+    )
+    parser.add_argument(
+        "--output-format",
+        type=str,
+        default="json",
+        choices=["json", "jsonl"],
+        help="Transcript output: one indented JSON file per session (json, default) or one line per session appended to outputs/transcripts/transcripts.jsonl (jsonl)"
+    )
+    parser.add_argument(
+        "--embed-details",
+        action="store_true",
+        help="Embed the full template and persona definitions in every transcript (default: store only their ids; definitions are written once to outputs/templates_index.json and outputs/personas_index.json)"
+    )
     parser.add_argument(
         "--test-profile",
         action="store_true",
@@ -123,11 +173,16 @@ def main():
         type=str,
         default=DEFAULT_LOG_LEVEL,
         choices=LOG_LEVELS,
-        help=f"Logging verbosity (default: {DEFAULT_LOG_LEVEL}). 'minimal' shows only dialogue, 'light' adds manager guidance, 'heavy' shows all parameters"
+        help=f"Logging verbosity (default: {DEFAULT_LOG_LEVEL}). 'quiet' shows only per-session results, 'minimal' shows only dialogue, 'light' adds manager guidance, 'heavy' shows all parameters"
     )
     
     args = parser.parse_args()
     
+    # A semaphore of 0 would block every session forever (and a negative one
+    # raises from asyncio), so reject it up front
+    if args.concurrency < 1:
+        parser.error(f"--concurrency must be at least 1 (got {args.concurrency})")
+    
     # Load environment variables from .env file
     load_dotenv()
     
@@ -135,12 +190,18 @@ def main():
     config.OPENAI_MODEL = args.model
     print(f"Using model: {args.model}")
     
+    # Set rate limits in config (read when the shared limiter is first created)
+    config.MAX_REQUESTS_PER_MINUTE = args.max_requests_per_minute
+    config.MAX_TOKENS_PER_MINUTE = args.max_tokens_per_minute
+    
     # Set up random seed
     if args.seed is not None:
         seed = args.seed
         config.RANDOM_SEED = seed
     else:
-        seed = random.randint(1, 1000000)
+        # Draw from OS entropy so the global random state is never touched;
+        # every session RNG is derived from this one seed below
+        seed = random.SystemRandom().randint(1, 1000000)
         config.RANDOM_SEED = seed
     
     print(f"Using random seed: {seed}")
@@ -178,7 +239,9 @@ def main():
         print("\n=== TEST PROFILE MODE ===")
         print("Sampling patient profile without LLM calls...\n")
         
-        profile = sample_patient_profile(rng, forced=forced_overrides if forced_overrides else None)
+        # Skip the background writer: it is an LLM call, and this mode must not
+        # need an API key
+        profile = sample_patient_profile(rng, forced={**forced_overrides, "skip_life_background": True})
         
         # Print profile as JSON
         print(json.dumps(profile, indent=2, default=str))
@@ -242,7 +305,7 @@ def main():
         pm_input = build_patient_manager_input(
             last_doctor_message=dummy_doctor_msg,
             last_doctor_move=dummy_last_move,
-            conversation_history=dummy_conversation,
+            conversation_context=format_conversation_context(dummy_conversation),
             patient_meta=patient_meta,
             depression_profile=depression_profile,
             disclosure_state=disclosure_state,
@@ -254,7 +317,6 @@ def main():
         
         # Create patient manager agent and call
         # Note: gpt-5-mini doesn't support temperature parameter
-        session = SQLiteSession(":memory:")
         runner = Runner()
         if config.OPENAI_MODEL == "gpt-5-mini":
             model_settings = ModelSettings(max_tokens=300)
@@ -265,7 +327,7 @@ def main():
         )
         
         try:
-            pm_res = runner.run_sync(patient_manager_agent, pm_input, session=session)
+            pm_res = runner.run_sync(patient_manager_agent, pm_input)
             pm_output = pm_res.final_output
             
             print("=== Patient Manager Raw Output ===")
@@ -290,65 +352,139 @@ def main():
         
         return
     
-    print(f"\n=== GENERATING {args.num_sessions} SESSION(S) ===\n")
+    print(f"\n=== GENERATING {args.num_sessions} SESSION(S) (concurrency={args.concurrency}) ===\n")
     
-    # Generate sessions
-    for i in range(args.num_sessions):
-        print(f"\n--- Session {i + 1}/{args.num_sessions} ---")
-        
-        # Build forced agent profile if needed
-        forced_agent_profile = None
-        if forced_overrides or args.forced_persona:
-            # Sample a profile first (this calls the background writer)
-            profile = sample_patient_profile(rng, forced=forced_overrides if forced_overrides else None)
-            forced_agent_profile = {
-                "template_id": profile["template_id"],
-                "template": profile["template"],
-                "personality": profile["personality"],
-                "depression_profile": profile["depression_profile"],
-                "life_background": profile.get("life_background"),  # Include life background!
-                "background_writer_prompt_trace": profile.get("background_writer_prompt_trace"),
-            }
-            # Select doctor persona (forced or random)
-            if args.forced_persona:
-                forced_agent_profile["doctor_persona_id"] = args.forced_persona
-            else:
-                # Randomly select persona using the RNG
-                forced_agent_profile["doctor_persona_id"] = rng.choice(DOCTOR_PERSONAS)["id"]
-            # Sample microstyle
-            forced_agent_profile["doctor_microstyle"] = sample_doctor_microstyle()
-        
-        # Map log level string to constant
-        log_level_map = {
-            "minimal": LOG_MINIMAL,
-            "light": LOG_LIGHT,
-            "heavy": LOG_HEAVY,
-        }
-        log_level = log_level_map.get(args.log_level, DEFAULT_LOG_LEVEL)
-        
-        # Run session
-        try:
-            session_data = run_patient_doctor_session(
-                rng=rng,
-                use_random_agent=(forced_agent_profile is None),
-                forced_agent_profile=forced_agent_profile,
-                log_level=log_level,
-            )
-            
-            # Save transcript
-            filepath = save_transcript(session_data)
-            print(f"\n✓ Session saved: {filepath}")
-            print(f"  Template: {session_data['template_id']}")
-            print(f"  Persona: {session_data['persona_id']}")
-            print(f"  Agent ID: {session_data['agent_id']}")
-            
-        except Exception as e:
-            print(f"\n✗ Error generating session {i + 1}: {e}")
-            import traceback
-            traceback.print_exc()
+    # Map log level string to constant
+    log_level_map = {
+        "quiet": LOG_QUIET,
+        "minimal": LOG_MINIMAL,
+        "light": LOG_LIGHT,
+        "heavy": LOG_HEAVY,
+    }
+    log_level = log_level_map.get(args.log_level, DEFAULT_LOG_LEVEL)
+    
+    # uvloop's event loop has lower per-request overhead at high concurrency
+    if uvloop is not None:
+        uvloop.run(run_sessions(args, rng, forced_overrides, log_level))
+    else:
+        asyncio.run(run_sessions(args, rng, forced_overrides, log_level))
     
     print(f"\n=== COMPLETE: Generated {args.num_sessions} session(s) ===")
 
 
+def build_forced_agent_profile(
+    profile: Dict[str, Any],
+    rng: random.Random,
+    forced_persona: Optional[str],
+) -> Dict[str, Any]:
+    """Turn a sampled patient profile into a forced_agent_profile for run_patient_doctor_session."""
+    forced_agent_profile = {
+        "template_id": profile["template_id"],
+        "template": profile["template"],
+        "personality": profile["personality"],
+        "depression_profile": profile["depression_profile"],
+        "life_background": profile.get("life_background"),  # Include life background!
+        "background_writer_prompt_trace": profile.get("background_writer_prompt_trace"),
+    }
+    # Select doctor persona (forced or random)
+    if forced_persona:
+        forced_agent_profile["doctor_persona_id"] = forced_persona
+    else:
+        # Randomly select persona using the RNG
+        forced_agent_profile["doctor_persona_id"] = rng.choice(DOCTOR_PERSONAS)["id"]
+    # Sample microstyle
+    forced_agent_profile["doctor_microstyle"] = sample_doctor_microstyle(rng)
+    return forced_agent_profile
+
+
+async def run_sessions(
+    args: argparse.Namespace,
+    rng: random.Random,
+    forced_overrides: Dict[str, Any],
+    log_level: str,
+) -> None:
+    """
+    Generate args.num_sessions sessions concurrently, at most args.concurrency at a time.
+    
+    Each session gets its own RNG seeded from the master RNG up front, so results
+    are reproducible for a given --seed regardless of how sessions interleave.
+    With --batch, all life backgrounds are generated first in one Batch API job.
+    """
+    semaphore = asyncio.Semaphore(args.concurrency)
+    # In jsonl mode, transcripts, prompt traces and raw logs each go to one
+    # append-only file instead of one file per session
+    transcript_writer = trace_writer = raw_log_writer = None
+    if args.output_format == "jsonl":
+        transcript_writer = JsonlTranscriptWriter()
+        trace_writer = JsonlTranscriptWriter("outputs/prompt_traces/prompt_traces.jsonl")
+        raw_log_writer = JsonlTranscriptWriter("outputs/logs/sessions_raw.jsonl")
+    if not args.embed_details:
+        write_details_index()
+    session_seeds = [rng.randint(1, 1000000000) for _ in range(args.num_sessions)]
+    session_rngs = [random.Random(session_seed) for session_seed in session_seeds]
+    
+    batch_profiles = None
+    if args.batch:
+        print("Generating life backgrounds via the OpenAI Batch API (this may take a while)...")
+        batch_profiles = await sample_patient_profiles_batch(
+            session_rngs, forced=forced_overrides if forced_overrides else None
+        )
+    
+    async def run_one(i: int, session_rng: random.Random) -> None:
+        async with semaphore:
+            print(f"\n--- Session {i + 1}/{args.num_sessions} ---")
+            
+            try:
+                # Build forced agent profile if needed
+                forced_agent_profile = None
+                if batch_profiles is not None:
+                    forced_agent_profile = build_forced_agent_profile(
+                        batch_profiles[i], session_rng, args.forced_persona
+                    )
+                elif forced_overrides or args.forced_persona:
+                    # Sample a profile first (this calls the background writer)
+                    profile = await sample_patient_profile_async(
+                        session_rng, forced=forced_overrides if forced_overrides else None
+                    )
+                    forced_agent_profile = build_forced_agent_profile(
+                        profile, session_rng, args.forced_persona
+                    )
+                
+                # Run session
+                session_data = await run_patient_doctor_session(
+                    rng=session_rng,
+                    use_random_agent=(forced_agent_profile is None),
+                    forced_agent_profile=forced_agent_profile,
+                    log_level=log_level,
+                    buffer_output=(args.concurrency > 1),
+                    trace_writer=trace_writer,
+                    raw_log_writer=raw_log_writer,
+                    embed_details=args.embed_details,
+                )
+                
+                # Save transcript
+                if transcript_writer is not None:
+                    filepath = transcript_writer.write(session_data)
+                else:
+                    filepath = save_transcript(session_data)
+                print(f"\n✓ Session saved: {filepath}")
+                print(f"  Template: {session_data['template_id']}")
+                print(f"  Persona: {session_data['persona_id']}")
+                print(f"  Agent ID: {session_data['agent_id']}")
+                
+            except Exception as e:
+                print(f"\n✗ Error generating session {i + 1}: {e}")
+                import traceback
+                traceback.print_exc()
+    
+    try:
+        await asyncio.gather(*(run_one(i, session_rng) for i, session_rng in enumerate(session_rngs)))
+    finally:
+        for writer in (transcript_writer, trace_writer, raw_log_writer):
+            if writer is not None:
+                writer.close()
+        await close_openai_client()
+
+
 if __name__ == "__main__":
     main()
@@ -3,12 +3,13 @@
 # ============================================================================
 
 # Log level constants
+LOG_QUIET = "quiet"      # No per-turn output; only the per-session summary from the CLI
 LOG_MINIMAL = "minimal"  # Just dialogue (doctor/patient responses)
 LOG_LIGHT = "light"      # Default. Adds manager guidance, next action, disclosure state
 LOG_HEAVY = "heavy"      # Everything: tone tags, key points, emotional state, full instructions
 
 # Available log levels for CLI validation
-LOG_LEVELS = [LOG_MINIMAL, LOG_LIGHT, LOG_HEAVY]
+LOG_LEVELS = [LOG_QUIET, LOG_MINIMAL, LOG_LIGHT, LOG_HEAVY]
 
 
 # ============================================================================
@@ -39,6 +40,27 @@ RANDOM_TEMPERATURE = False
 RANDOM_MAX_TOKENS = False
 
 
+# ============================================================================
+# RATE LIMITS
+# ============================================================================
+
+# Per-minute request and token budgets shared by all concurrent sessions
+# (defaults match OpenAI usage tier 1 for gpt-4.1-mini / gpt-5-mini)
+MAX_REQUESTS_PER_MINUTE = 500
+MAX_TOKENS_PER_MINUTE = 200000
+
+# Attempts per call before a transient API error (429, timeout, connection, 5xx)
+# is raised (exponential backoff between)
+RATE_LIMIT_MAX_ATTEMPTS = 5
+
+# Connection pool and timeouts for the shared OpenAI HTTP client
+HTTP_MAX_CONNECTIONS = 256
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 128
+HTTP_KEEPALIVE_EXPIRY_SECONDS = 60.0
+HTTP_CONNECT_TIMEOUT_SECONDS = 10.0
+HTTP_TIMEOUT_SECONDS = 600.0  # read timeout; reasoning models can take minutes
+
+
 # ============================================================================
 # AGENT-SPECIFIC SETTINGS
 # ============================================================================
@@ -80,6 +102,9 @@ BUFFER_TURNS = 5
 # Default number of sessions to run
 DEFAULT_NUM_SESSIONS = 10
 
+# Default number of sessions run concurrently (sessions are I/O-bound on API calls)
+DEFAULT_CONCURRENCY = 4
+
 # Default doctor persona for deterministic runs
 DEFAULT_DOCTOR_PERSONA_ID = "warm_validating"
 
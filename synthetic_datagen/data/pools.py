@@ -1,7 +1,7 @@
 """
 Data pools for patient profile generation (pacing, contexts, intensity, voice styles, etc.).
 """
-from typing import List, Dict
+from typing import List, Dict, Tuple, FrozenSet
 
 # Conversation pacing levels (patient elaboration style)
 PACING_LEVELS: List[str] = ["LOW", "MED", "HIGH"]
@@ -94,8 +94,8 @@ AGE_WEIGHTS_BY_ROLE: Dict[str, List[float]] = {
     "between roles": [1.5, 2, 2.5, 2, 1.5, 1, 0.8, 0.6, 0.4],
 }
 
-# Life facet categories for rich background generation
-LIFE_FACET_CATEGORIES: List[str] = [
+# Life facet categories for rich background generation (immutable enumeration)
+LIFE_FACET_CATEGORIES: Tuple[str, ...] = (
     # Identity / basic context
     "identity_stage",
     "cultural_background_orientation",
@@ -172,7 +172,7 @@ LIFE_FACET_CATEGORIES: List[str] = [
     
     # Obsessions / preoccupations
     "preoccupations_or_obsessions",
-]
+)
 
 # Trauma/adversity facet categories (subset of LIFE_FACET_CATEGORIES)
 TRAUMA_ADVERSITY_FACETS: List[str] = [
@@ -182,3 +182,6 @@ TRAUMA_ADVERSITY_FACETS: List[str] = [
     "significant_move_or_transition",
     "loss_or_change",
 ]
+
+# Set form of TRAUMA_ADVERSITY_FACETS for O(1) membership checks
+TRAUMA_ADVERSITY_SET: FrozenSet[str] = frozenset(TRAUMA_ADVERSITY_FACETS)
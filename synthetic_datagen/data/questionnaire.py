@@ -1,9 +1,10 @@
 """
 DSM-5 depression screening symptom keys.
 """
-from typing import List
+from typing import Tuple
 
-DSM_ITEMS: List[str] = [
+# Canonical symptom list (templates.DSM5_DEPRESSION_SYMPTOMS is the same tuple)
+DSM_ITEMS: Tuple[str, ...] = (
     "Depressed mood",
     "Loss of interest or pleasure",
     "Significant weight/appetite changes",
@@ -13,7 +14,7 @@ DSM_ITEMS: List[str] = [
     "Feelings of worthlessness or excessive guilt",
     "Difficulty concentrating or indecisiveness",
     "Recurrent thoughts of death or suicide",
-]
+)
 
 # Legacy name for backwards compatibility during transition
 QUESTIONNAIRE = [(key, "") for key in DSM_ITEMS]
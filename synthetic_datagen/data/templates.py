@@ -1,20 +1,12 @@
 """
 DSM-5 symptom lists, frequency categories, and Big Five depression templates.
 """
-from typing import List, Dict, Any
+from typing import Dict, Any, Tuple
 
-# DSM‑5 Depression symptom catalogue
-DSM5_DEPRESSION_SYMPTOMS: List[str] = [
-    "Depressed mood",
-    "Loss of interest or pleasure",
-    "Significant weight/appetite changes",
-    "Sleep disturbances",
-    "Psychomotor agitation or retardation",
-    "Fatigue or loss of energy",
-    "Feelings of worthlessness or excessive guilt",
-    "Difficulty concentrating or indecisiveness",
-    "Recurrent thoughts of death or suicide",
-]
+from synthetic_datagen.data.questionnaire import DSM_ITEMS
+
+# DSM‑5 Depression symptom catalogue (shared with questionnaire.DSM_ITEMS)
+DSM5_DEPRESSION_SYMPTOMS: Tuple[str, ...] = DSM_ITEMS
 
 # Frequency categories for symptom presence across last 14 days
 FREQUENCY_CATEGORIES: Dict[str, str] = {
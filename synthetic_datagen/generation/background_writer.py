@@ -2,19 +2,25 @@
 Background writer logic for generating patient life contexts.
 """
 import json
+import math
 import random
-from typing import Dict, List, Any, Optional
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
 
-from agents import Agent, ModelSettings, Runner, SQLiteSession
+from agents import Agent, ModelSettings, Runner
 from synthetic_datagen.config import OPENAI_MODEL, BACKGROUND_WRITER_TEMPERATURE, BACKGROUND_WRITER_MAX_TOKENS
 
 
+@lru_cache(maxsize=1)
 def get_background_writer_model_settings() -> ModelSettings:
     """
     Get ModelSettings for background writer agent.
     
     Note: gpt-5-mini does not support temperature parameter.
     For gpt-5-mini, we omit model_settings entirely to use defaults.
+    
+    The settings are fixed by config, so a single shared instance is cached.
     """
     if OPENAI_MODEL == "gpt-5-mini":
         # Return None to use default model settings - gpt-5-mini may have issues with explicit ModelSettings
@@ -27,10 +33,94 @@ def get_background_writer_model_settings() -> ModelSettings:
 from synthetic_datagen.data.pools import (
     LIFE_FACET_CATEGORIES,
     TRAUMA_ADVERSITY_FACETS,
+    TRAUMA_ADVERSITY_SET,
     GENERIC_CONTEXT_DOMAINS,
 )
 from synthetic_datagen.data.life_background import PatientLifeBackground, LifeFacet
 from synthetic_datagen.prompts.background_writer_prompt import BACKGROUND_WRITER_SYSTEM_PROMPT
+from synthetic_datagen.utils.rate_limit import run_agent
+from synthetic_datagen.utils.io import loads_json, extract_json_object
+from synthetic_datagen.utils.console import session_print
+
+
+# Facet weights before any per-patient boosts (copied, not rebuilt, per call)
+_BASE_CATEGORY_WEIGHTS: Dict[str, float] = {cat: 1.0 for cat in LIFE_FACET_CATEGORIES}
+
+# "All available facets" list for the writer input; identical for every patient
+_ALL_FACETS_BULLETS = "\n".join([f"- {cat}" for cat in LIFE_FACET_CATEGORIES])
+
+# Static opening of every writer input. It comes before the per-patient fields
+# so that, together with the system prompt, it forms a prefix shared by all
+# writer calls (OpenAI prompt caching).
+_WRITER_INPUT_HEAD = (
+    "All available facets (you may add 2-5 extra from this list):\n"
+    f"{_ALL_FACETS_BULLETS}\n\n"
+)
+
+# Possible required-facet counts; exactly four, so two random bits pick one
+_NUM_FACET_CHOICES = (5, 6, 7, 8)
+
+# Context domains that boost trauma/adversity facets regardless of severity
+_HEAVY_CONTEXT_DOMAINS = frozenset({"grief/bereavement", "major life transition"})
+
+
+def _domain_boosts(domain: str) -> Tuple[Tuple[str, float], ...]:
+    """
+    Facet weight overrides implied by a context domain, in the order applied.
+    
+    Matching is by keyword so domains outside GENERIC_CONTEXT_DOMAINS (e.g. forced
+    ones) still get boosts; pool domains are looked up in _DOMAIN_BOOSTS instead.
+    """
+    boosts: List[Tuple[str, float]] = []
+    if "work" in domain or "role" in domain:
+        boosts += [
+            ("work_or_study_pressure", 3.0),
+            ("sense_of_achievement", 2.0),
+            ("role_conflicts", 2.0),
+            ("responsibility_load", 2.0),
+        ]
+    
+    if "relationship" in domain:
+        boosts += [
+            ("family_relationship_pattern", 2.5),
+            ("closest_friend_or_confidant", 2.0),
+            ("key_partner_or_love_interest", 2.0),
+            ("conflictual_relationship", 2.0),
+        ]
+    
+    if "health" in domain:
+        boosts += [
+            ("physical_health_constraints", 3.0),
+            ("sleep_pattern_tendency", 2.0),
+            ("body_image_concerns_or_comfort", 1.5),
+        ]
+    
+    if "self-worth" in domain or "identity" in domain:
+        boosts += [
+            ("self_view", 2.5),
+            ("beliefs_about_self_worth", 2.5),
+            ("identity_stage", 2.0),
+        ]
+    
+    if "transition" in domain:
+        boosts += [
+            ("significant_move_or_transition", 2.5),
+            ("stalled_goal", 2.0),
+            ("loss_or_change", 2.0),
+        ]
+    
+    if "grief" in domain or "bereavement" in domain:
+        boosts += [
+            ("loss_or_change", 3.0),
+            ("unresolved_issue", 2.0),
+        ]
+    return tuple(boosts)
+
+
+# Boosts for every pool domain, resolved once so sampling does no string scans
+_DOMAIN_BOOSTS: Dict[str, Tuple[Tuple[str, float], ...]] = {
+    domain: _domain_boosts(domain) for domain in GENERIC_CONTEXT_DOMAINS
+}
 
 
 def compute_symptom_severity(depression_profile: Dict[str, str]) -> str:
@@ -47,10 +137,8 @@ def compute_symptom_severity(depression_profile: Dict[str, str]) -> str:
     str
         "minimal", "mild", "moderate", or "severe"
     """
-    # Count symptoms by frequency
-    counts = {"NONE": 0, "RARE": 0, "SOME": 0, "OFTEN": 0}
-    for freq in depression_profile.values():
-        counts[freq] = counts.get(freq, 0) + 1
+    # Count symptoms by frequency (missing codes count as 0)
+    counts = Counter(depression_profile.values())
     
     # Count significant symptoms (SOME or OFTEN)
     significant_count = counts["SOME"] + counts["OFTEN"]
@@ -93,47 +181,22 @@ def select_required_facets(
         List of 5-8 facet category IDs
     """
     # Build weighted category pool
-    category_weights = {cat: 1.0 for cat in LIFE_FACET_CATEGORIES}
+    category_weights = _BASE_CATEGORY_WEIGHTS.copy()
     
     # Boost categories related to context domains
     for domain in context_domains:
-        if "work" in domain or "role" in domain:
-            category_weights["work_or_study_pressure"] = 3.0
-            category_weights["sense_of_achievement"] = 2.0
-            category_weights["role_conflicts"] = 2.0
-            category_weights["responsibility_load"] = 2.0
-        
-        if "relationship" in domain:
-            category_weights["family_relationship_pattern"] = 2.5
-            category_weights["closest_friend_or_confidant"] = 2.0
-            category_weights["key_partner_or_love_interest"] = 2.0
-            category_weights["conflictual_relationship"] = 2.0
-        
-        if "health" in domain:
-            category_weights["physical_health_constraints"] = 3.0
-            category_weights["sleep_pattern_tendency"] = 2.0
-            category_weights["body_image_concerns_or_comfort"] = 1.5
-        
-        if "self-worth" in domain or "identity" in domain:
-            category_weights["self_view"] = 2.5
-            category_weights["beliefs_about_self_worth"] = 2.5
-            category_weights["identity_stage"] = 2.0
-        
-        if "transition" in domain:
-            category_weights["significant_move_or_transition"] = 2.5
-            category_weights["stalled_goal"] = 2.0
-            category_weights["loss_or_change"] = 2.0
-        
-        if "grief" in domain or "bereavement" in domain:
-            category_weights["loss_or_change"] = 3.0
-            category_weights["unresolved_issue"] = 2.0
+        boosts = _DOMAIN_BOOSTS.get(domain)
+        if boosts is None:
+            boosts = _domain_boosts(domain)
+        for cat, weight in boosts:
+            category_weights[cat] = weight
     
     # Always include core stressor-related categories
     category_weights["current_primary_stressor"] = 4.0
     category_weights["coping_style"] = 2.5
     
     # Boost trauma/adversity categories for moderate/severe cases
-    if severity in ["moderate", "severe"] or any(d in ["grief/bereavement", "major life transition"] for d in context_domains):
+    if severity in ("moderate", "severe") or not _HEAVY_CONTEXT_DOMAINS.isdisjoint(context_domains):
         for trauma_cat in TRAUMA_ADVERSITY_FACETS:
             if trauma_cat in category_weights:
                 category_weights[trauma_cat] = category_weights[trauma_cat] * 1.5
@@ -144,31 +207,32 @@ def select_required_facets(
                 category_weights[trauma_cat] = category_weights[trauma_cat] * 0.5
     
     # Sample 5-8 categories
-    num_facets = rng.randint(5, 8)
+    num_facets = _NUM_FACET_CHOICES[rng.getrandbits(2)]
     
-    # Ensure at most 2 trauma/adversity facets in required set
+    # Weighted sampling without replacement in one pass (Efraimidis-Spirakis):
+    # each category gets the key log(u) / weight, and ranking by key gives the
+    # same order distribution as drawing categories one at a time in proportion
+    # to weight. 1 - random() lies in (0, 1], so log() is always defined.
+    ranked = sorted(
+        category_weights,
+        key=lambda cat: math.log(1.0 - rng.random()) / category_weights[cat],
+        reverse=True,
+    )
+    
+    # Walk the ranking; skipping trauma/adversity facets once two are taken
+    # enforces the cap without redrawing
     trauma_in_required = 0
     selected = []
-    
-    # Convert to list for weighted sampling
-    categories = list(category_weights.keys())
-    weights = [category_weights[cat] for cat in categories]
-    
-    attempts = 0
-    while len(selected) < num_facets and attempts < 100:
-        attempts += 1
-        candidate = rng.choices(categories, weights=weights, k=1)[0]
-        
-        if candidate in selected:
-            continue
-        
-        # Check trauma limit
-        if candidate in TRAUMA_ADVERSITY_FACETS:
+    for candidate in ranked:
+        if candidate in TRAUMA_ADVERSITY_SET:
+            # Ensure at most 2 trauma/adversity facets in required set
             if trauma_in_required >= 2:
                 continue
             trauma_in_required += 1
         
         selected.append(candidate)
+        if len(selected) == num_facets:
+            break
     
     return selected
 
@@ -231,10 +295,7 @@ episode_density: {episode_density}"""
     # Format required facets
     required_str = "\n".join([f"- {cat}" for cat in required_facets])
     
-    # Format all facets
-    all_str = "\n".join([f"- {cat}" for cat in LIFE_FACET_CATEGORIES])
-    
-    return f"""Age range: {age_range}
+    return _WRITER_INPUT_HEAD + f"""Age range: {age_range}
 
 Personality summary:
 {personality_summary}
@@ -251,9 +312,6 @@ Context domains:
 Required facets (you must fill all of these):
 {required_str}
 
-All available facets (you may add 2-5 extra from this list):
-{all_str}
-
 Task: Generate the patient life background and output JSON only."""
 
 
@@ -272,18 +330,8 @@ def parse_background_writer_output(output: str) -> Optional[PatientLifeBackgroun
         Parsed background object, or None if parsing fails
     """
     try:
-        # Strip markdown code fences if present
-        cleaned = output.strip()
-        if cleaned.startswith("```json"):
-            cleaned = cleaned[7:]
-        if cleaned.startswith("```"):
-            cleaned = cleaned[3:]
-        if cleaned.endswith("```"):
-            cleaned = cleaned[:-3]
-        cleaned = cleaned.strip()
-        
-        # Parse JSON
-        data = json.loads(cleaned)
+        # Extract the JSON object (dropping any code fence or prose), then parse it
+        data = loads_json(extract_json_object(output))
         
         # Parse life facets
         life_facets = []
@@ -306,42 +354,28 @@ def parse_background_writer_output(output: str) -> Optional[PatientLifeBackgroun
         )
         
     except (json.JSONDecodeError, KeyError, TypeError) as e:
-        print(f"Warning: Failed to parse background writer output: {e}")
+        session_print(f"Warning: Failed to parse background writer output: {e}")
         return None
 
 
-def call_background_writer(
+def prepare_background_writer_input(
     rng: random.Random,
     personality: Dict[str, Any],
     depression_profile: Dict[str, str],
     basic_background: Dict[str, str],
     context_domains: List[str],
     age_range: str,
-) -> Dict[str, Any]:
+) -> str:
     """
-    Call the background writer agent to generate patient life background.
+    Select required facets and build the background writer input.
+    
+    Shared by the sync, async and batch entry points so all of them consume
+    the RNG identically.
     
-    Parameters
-    ----------
-    rng : random.Random
-        Random number generator
-    personality : dict
-        Personality profile
-    depression_profile : dict
-        Symptom frequency mapping
-    basic_background : dict
-        Basic background tags
-    context_domains : list
-        Context domains
-    age_range : str
-        Age range string (e.g., "25-29", "40-49")
-        
     Returns
     -------
-    dict
-        Dictionary containing:
-        - "background": PatientLifeBackground or None
-        - "prompt_trace": dict with system_prompt, input, output for logging
+    str
+        Formatted background writer input
     """
     # Compute severity
     severity = compute_symptom_severity(depression_profile)
@@ -352,14 +386,22 @@ def call_background_writer(
     )
     
     # Build input (including age_range)
-    writer_input = build_background_writer_input(
+    return build_background_writer_input(
         personality, depression_profile, basic_background, context_domains, required_facets, age_range
     )
+
+
+@lru_cache(maxsize=1)
+def build_background_writer_agent() -> Agent:
+    """
+    Create the background writer agent for the current model.
     
-    # Create agent
+    The agent is stateless and identical for every patient (fixed instructions,
+    model and settings), so one instance is built and shared by all calls.
+    """
     model_settings = get_background_writer_model_settings()
     if model_settings is not None:
-        background_writer = Agent(
+        return Agent(
             name="BackgroundWriter",
             model=OPENAI_MODEL,
             instructions=BACKGROUND_WRITER_SYSTEM_PROMPT,
@@ -367,46 +409,135 @@ def call_background_writer(
         )
     else:
         # For gpt-5-mini, don't pass model_settings to avoid issues
-        background_writer = Agent(
+        return Agent(
             name="BackgroundWriter",
             model=OPENAI_MODEL,
             instructions=BACKGROUND_WRITER_SYSTEM_PROMPT,
         )
+
+
+def build_background_writer_batch_request(custom_id: str, writer_input: str) -> Dict[str, Any]:
+    """
+    Build one OpenAI Batch API request line for the background writer.
     
-    # Call agent
-    session = SQLiteSession(":memory:")
-    runner = Runner()
+    Mirrors the settings of build_background_writer_agent, targeting the
+    /v1/chat/completions endpoint.
+    """
+    body = {
+        "model": OPENAI_MODEL,
+        "messages": [
+            {"role": "system", "content": BACKGROUND_WRITER_SYSTEM_PROMPT},
+            {"role": "user", "content": writer_input},
+        ],
+    }
+    model_settings = get_background_writer_model_settings()
+    if model_settings is not None:
+        body["temperature"] = model_settings.temperature
+        body["max_tokens"] = model_settings.max_tokens
     
-    try:
-        result = runner.run_sync(background_writer, writer_input, session=session)
-        output = result.final_output
-        
-        # Parse output
-        background = parse_background_writer_output(output)
-        
-        # Build prompt trace for logging
-        prompt_trace = {
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": body,
+    }
+
+
+def build_background_writer_result(writer_input: str, output: str) -> Dict[str, Any]:
+    """Parse background writer output and attach the prompt trace for logging."""
+    return {
+        "background": parse_background_writer_output(output),
+        "prompt_trace": {
             "agent": "background_writer",
             "turn_index": 0,
             "system_prompt": BACKGROUND_WRITER_SYSTEM_PROMPT,
             "input": writer_input,
             "output": output,
-        }
-        
-        return {
-            "background": background,
-            "prompt_trace": prompt_trace,
-        }
+        },
+    }
+
+
+def build_background_writer_error(writer_input: str, error: Exception) -> Dict[str, Any]:
+    """Build the fallback result returned when the background writer call fails."""
+    session_print(f"Warning: Background writer failed: {error}")
+    return {
+        "background": None,
+        "prompt_trace": {
+            "agent": "background_writer",
+            "turn_index": 0,
+            "system_prompt": BACKGROUND_WRITER_SYSTEM_PROMPT,
+            "input": writer_input,
+            "output": f"ERROR: {str(error)}",
+        },
+    }
+
+
+def call_background_writer(
+    rng: random.Random,
+    personality: Dict[str, Any],
+    depression_profile: Dict[str, str],
+    basic_background: Dict[str, str],
+    context_domains: List[str],
+    age_range: str,
+) -> Dict[str, Any]:
+    """
+    Call the background writer agent to generate patient life background.
+    
+    Parameters
+    ----------
+    rng : random.Random
+        Random number generator
+    personality : dict
+        Personality profile
+    depression_profile : dict
+        Symptom frequency mapping
+    basic_background : dict
+        Basic background tags
+    context_domains : list
+        Context domains
+    age_range : str
+        Age range string (e.g., "25-29", "40-49")
         
+    Returns
+    -------
+    dict
+        Dictionary containing:
+        - "background": PatientLifeBackground or None
+        - "prompt_trace": dict with system_prompt, input, output for logging
+    """
+    writer_input = prepare_background_writer_input(
+        rng, personality, depression_profile, basic_background, context_domains, age_range
+    )
+    background_writer = build_background_writer_agent()
+    
+    # Call agent (stateless, so no session)
+    try:
+        result = Runner.run_sync(background_writer, writer_input)
+        return build_background_writer_result(writer_input, result.final_output)
+    except Exception as e:
+        return build_background_writer_error(writer_input, e)
+
+
+async def call_background_writer_async(
+    rng: random.Random,
+    personality: Dict[str, Any],
+    depression_profile: Dict[str, str],
+    basic_background: Dict[str, str],
+    context_domains: List[str],
+    age_range: str,
+) -> Dict[str, Any]:
+    """
+    Async variant of call_background_writer for use inside a running event loop.
+    
+    Takes the same parameters and returns the same dict as call_background_writer.
+    """
+    writer_input = prepare_background_writer_input(
+        rng, personality, depression_profile, basic_background, context_domains, age_range
+    )
+    background_writer = build_background_writer_agent()
+    
+    try:
+        result = await run_agent(background_writer, writer_input)
+        return build_background_writer_result(writer_input, result.final_output)
     except Exception as e:
-        print(f"Warning: Background writer failed: {e}")
-        return {
-            "background": None,
-            "prompt_trace": {
-                "agent": "background_writer",
-                "turn_index": 0,
-                "system_prompt": BACKGROUND_WRITER_SYSTEM_PROMPT,
-                "input": writer_input,
-                "output": f"ERROR: {str(e)}",
-            },
-        }
+        return build_background_writer_error(writer_input, e)
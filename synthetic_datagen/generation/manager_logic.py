@@ -3,49 +3,104 @@ Doctor manager and patient manager logic helpers for conversation management.
 """
 import json
 import random
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional
 
+from synthetic_datagen.utils.io import loads_json, extract_json_object
 
-def build_manager_input(
-    conversation_history: List[Dict[str, str]],
-    dsm_symptom_keys: List[str],
+
+def format_conversation_context(conversation_history: List[Dict[str, str]]) -> str:
+    """
+    Render the conversation as a speaker-labelled transcript for manager agents.
+    
+    Managers observe the dialogue rather than take part in it, so they get it
+    as text ("Doctor: ..." / "Patient: ...") instead of as chat messages, which
+    the model would read as its own conversation.
+    
+    Parameters
+    ----------
+    conversation_history : list
+        Conversation history with role/content dicts
+        
+    Returns
+    -------
+    str
+        One "Speaker: content" line per message
+    """
+    return "\n".join([_format_transcript_line(msg) for msg in conversation_history])
+
+
+def _format_transcript_line(msg: Dict[str, str]) -> str:
+    """Render one message as a "Speaker: content" transcript line."""
+    return f"{'Doctor' if msg['role'] == 'assistant' else 'Patient'}: {msg['content']}"
+
+
+class ConversationTranscript:
+    """
+    Incrementally maintained manager transcript for one session.
+    
+    The managers are called every turn with the whole conversation, so
+    re-rendering it from scratch makes formatting quadratic over a session.
+    This keeps the rendered lines plus how many messages have been folded in,
+    and on each render formats only the messages appended since the last call.
+    The conversation history must be append-only (as it is in the session
+    runner); the result is identical to format_conversation_context.
+    """
+    
+    def __init__(self) -> None:
+        self._lines: List[str] = []
+        self._text = ""
+    
+    def render(self, conversation_history: List[Dict[str, str]]) -> str:
+        """
+        Return the transcript for conversation_history, formatting only new messages.
+        
+        Parameters
+        ----------
+        conversation_history : list
+            Conversation history with role/content dicts; earlier calls must
+            have seen a prefix of this same list
+            
+        Returns
+        -------
+        str
+            One "Speaker: content" line per message
+        """
+        if len(conversation_history) != len(self._lines):
+            self._lines.extend(
+                _format_transcript_line(msg)
+                for msg in conversation_history[len(self._lines):]
+            )
+            self._text = "\n".join(self._lines)
+        return self._text
+
+
+def build_manager_header(
     doctor_persona_id: str,
     doctor_persona_style: str,
     patient_meta: Dict[str, Any],
-    remaining_doctor_turns: int,
 ) -> str:
     """
-    Build manager input with full conversation context (stateless operation).
+    Build the session-invariant opening of the doctor manager input.
+    
+    Persona, microstyle and patient profile never change within a session, so
+    the session runner builds this once and every doctor manager input (normal
+    and post-DSM) starts with it. Stable text first also keeps the prompt
+    prefix identical across turns for OpenAI prompt caching.
     
     Parameters
     ----------
-    conversation_history : list
-        Full conversation history with role/content dicts
-    dsm_symptom_keys : list
-        Remaining DSM symptom keys (strings only)
     doctor_persona_id : str
         ID of the doctor persona being used
     doctor_persona_style : str
         Brief description of doctor persona style
     patient_meta : dict
         Minimal patient metadata (template_id, trust, verbosity, pacing, risk_summary, patient_background, etc.)
-    remaining_doctor_turns : int
-        Number of doctor turns remaining in session
         
     Returns
     -------
     str
-        Formatted manager input string
+        Header text ending with the "Conversation so far:" label
     """
-    # Provide full conversation history (manager is stateless)
-    conversation_context = "\n".join([
-        f"{'Doctor' if msg['role'] == 'assistant' else 'Patient'}: {msg['content']}"
-        for msg in conversation_history
-    ])
-    
-    # Format remaining DSM symptom keys
-    remaining_dsm_list = "\n".join([f"- {key}" for key in dsm_symptom_keys])
-    
     # Extract patient meta
     template_id = patient_meta.get("template_id", "N/A")
     trust = patient_meta.get("trust", "N/A")
@@ -63,7 +118,7 @@ def build_manager_input(
     directness = patient_meta.get("directness", "N/A")
     microstyle_pacing = patient_meta.get("microstyle_pacing", "N/A")
     
-    manager_input = f"""Doctor persona:
+    return f"""Doctor persona:
 id: {doctor_persona_id}
 style: {doctor_persona_style}
 microstyle: warmth={warmth}, directness={directness}, pacing={microstyle_pacing}
@@ -79,19 +134,60 @@ pacing: {pacing}
 modifiers: {modifiers}
 episode_density: {episode_density}
 
+Conversation so far:
+"""
+
+
+def build_manager_input(
+    conversation_context: str,
+    dsm_symptom_keys: List[str],
+    manager_header: str,
+    remaining_doctor_turns: int,
+) -> str:
+    """
+    Build manager input with full conversation context (stateless operation).
+    
+    Parameters
+    ----------
+    conversation_context : str
+        Full conversation rendered by format_conversation_context (or
+        ConversationTranscript.render)
+    dsm_symptom_keys : list
+        Remaining DSM symptom keys (strings only)
+    manager_header : str
+        Session-invariant header from build_manager_header
+    remaining_doctor_turns : int
+        Number of doctor turns remaining in session
+        
+    Returns
+    -------
+    str
+        Formatted manager input string
+    """
+    # Provide full conversation history (manager is stateless).
+    # Stable profile fields and the append-only conversation come first so the
+    # prompt prefix stays identical across turns for OpenAI prompt caching;
+    # the shrinking DSM key list goes after the conversation.
+    
+    # Format remaining DSM symptom keys (one join, no per-key f-strings)
+    remaining_dsm_list = "- " + "\n- ".join(dsm_symptom_keys) if dsm_symptom_keys else ""
+    
+    manager_input = f"""{manager_header}{conversation_context}
+
 DSM symptom keys:
 {remaining_dsm_list}
 
-Conversation so far:
-{conversation_context}
-
 
 Task: Decide next_action and output JSON only."""
     
     return manager_input
 
 
-def parse_doctor_manager_output(manager_output: str, dsm_symptom_keys: List[str]) -> Dict[str, Any]:
+def parse_doctor_manager_output(
+    manager_output: str,
+    dsm_symptom_keys: List[str],
+    rng: Optional[random.Random] = None,
+) -> Dict[str, Any]:
     """
     Parse doctor manager JSON output with fallbacks.
     
@@ -101,6 +197,8 @@ def parse_doctor_manager_output(manager_output: str, dsm_symptom_keys: List[str]
         Raw output from doctor manager agent
     dsm_symptom_keys : list
         Remaining DSM symptom keys for fallback selection
+    rng : random.Random, optional
+        Session RNG for the fallback choice (global random module if omitted)
         
     Returns
     -------
@@ -112,17 +210,10 @@ def parse_doctor_manager_output(manager_output: str, dsm_symptom_keys: List[str]
         - dsm_symptom_key: str (empty if not DSM)
     """
     try:
-        # Strip markdown code fences if present
-        cleaned_output = manager_output.strip()
-        if cleaned_output.startswith("```json"):
-            cleaned_output = cleaned_output[7:]
-        if cleaned_output.startswith("```"):
-            cleaned_output = cleaned_output[3:]
-        if cleaned_output.endswith("```"):
-            cleaned_output = cleaned_output[:-3]
-        cleaned_output = cleaned_output.strip()
+        # Extract the JSON object (dropping any code fence or prose around it)
+        cleaned_output = extract_json_object(manager_output)
         
-        manager_decision = json.loads(cleaned_output)
+        manager_decision = loads_json(cleaned_output)
         next_action = manager_decision.get("next_action", "DSM")
         reason = manager_decision.get("reason", "")
         doctor_instruction = manager_decision.get("doctor_instruction", "") or ""
@@ -147,7 +238,7 @@ def parse_doctor_manager_output(manager_output: str, dsm_symptom_keys: List[str]
     except json.JSONDecodeError:
         # DSM fallback if invalid JSON
         if dsm_symptom_keys:
-            fallback_key = random.choice(dsm_symptom_keys)
+            fallback_key = (rng or random).choice(dsm_symptom_keys)
             return {
                 "next_action": "DSM",
                 "reason": "Doctor manager returned invalid JSON, using fallback",
@@ -167,7 +258,7 @@ def parse_doctor_manager_output(manager_output: str, dsm_symptom_keys: List[str]
 def build_patient_manager_input(
     last_doctor_message: str,
     last_doctor_move: str,
-    conversation_history: List[Dict[str, str]],
+    conversation_context: str,
     patient_meta: Dict[str, Any],
     depression_profile: Dict[str, str],
     disclosure_state: str,
@@ -181,8 +272,9 @@ def build_patient_manager_input(
         The most recent doctor message
     last_doctor_move : str
         Type of doctor's last action: "DSM", "FOLLOW_UP", or "RAPPORT"
-    conversation_history : list
-        Full conversation history with role/content dicts
+    conversation_context : str
+        Full conversation rendered by format_conversation_context (or
+        ConversationTranscript.render)
     patient_meta : dict
         Patient metadata including template_id, modifiers, voice_style, etc.
     depression_profile : dict
@@ -195,11 +287,9 @@ def build_patient_manager_input(
     str
         Formatted patient manager input string
     """
-    # Provide full conversation history (manager is stateless)
-    conversation_context = "\n".join([
-        f"{'Doctor' if msg['role'] == 'assistant' else 'Patient'}: {msg['content']}"
-        for msg in conversation_history
-    ])
+    # Provide full conversation history (manager is stateless).
+    # Turn-varying fields (disclosure state, last move) follow the conversation
+    # so the cacheable prompt prefix keeps growing across turns.
     
     # Format depression profile
     dep_profile_lines = "\n".join([
@@ -228,16 +318,16 @@ episode_density: {episode_density}
 modifiers: {modifiers}
 emphasized_symptoms: {emphasized_symptoms}
 
-Current disclosure_state: {disclosure_state}
-
 Depression profile (DSM symptoms):
 {dep_profile_lines}
 
-Doctor last move type: {last_doctor_move}
-
 Full conversation so far:
 {conversation_context}
 
+Current disclosure_state: {disclosure_state}
+
+Doctor last move type: {last_doctor_move}
+
 Doctor last message to respond to:
 {last_doctor_message}
 
@@ -265,17 +355,10 @@ def parse_post_dsm_manager_output(manager_output: str) -> Dict[str, Any]:
         - doctor_instruction: str
     """
     try:
-        # Strip markdown code fences if present
-        cleaned_output = manager_output.strip()
-        if cleaned_output.startswith("```json"):
-            cleaned_output = cleaned_output[7:]
-        if cleaned_output.startswith("```"):
-            cleaned_output = cleaned_output[3:]
-        if cleaned_output.endswith("```"):
-            cleaned_output = cleaned_output[:-3]
-        cleaned_output = cleaned_output.strip()
+        # Extract the JSON object (dropping any code fence or prose around it)
+        cleaned_output = extract_json_object(manager_output)
         
-        manager_decision = json.loads(cleaned_output)
+        manager_decision = loads_json(cleaned_output)
         next_action = manager_decision.get("next_action", "END")
         reason = manager_decision.get("reason", "")
         doctor_instruction = manager_decision.get("doctor_instruction", "") or ""
@@ -304,6 +387,51 @@ def parse_post_dsm_manager_output(manager_output: str) -> Dict[str, Any]:
         }
 
 
+# Patient manager guidance fields, in the order they are returned
+_PATIENT_GUIDANCE_KEYS: Tuple[str, ...] = (
+    "directness",
+    "disclosure_stage",
+    "target_length",
+    "emotional_state",
+    "tone_tags",
+    "key_points_to_reveal",
+    "key_points_to_avoid",
+    "patient_instruction",
+)
+
+# Fallback guidance derived from voice_style (anything unlisted maps to the middle value)
+_VERBOSITY_TO_TARGET_LENGTH: Dict[str, str] = {"terse": "SHORT", "detailed": "LONG"}
+_TRUST_TO_DIRECTNESS: Dict[str, str] = {"guarded": "LOW", "open": "HIGH"}
+_DEFAULT_PATIENT_INSTRUCTION = (
+    "Answer in a way consistent with your profile, moderately direct, and do not overshare."
+)
+
+
+def _default_patient_guidance(
+    base_voice_style: Dict[str, str],
+    current_disclosure_state: str,
+) -> Dict[str, Any]:
+    """
+    Build fallback patient guidance from voice style and disclosure state.
+    
+    Only called when the patient manager output is invalid or missing fields,
+    so the well-formed path never allocates it. Returns fresh lists each call.
+    """
+    # Map verbosity to target_length and trust to directness
+    verbosity = base_voice_style.get("verbosity", "moderate")
+    trust = base_voice_style.get("trust", "neutral")
+    return {
+        "directness": _TRUST_TO_DIRECTNESS.get(trust, "MED"),
+        "disclosure_stage": current_disclosure_state,
+        "target_length": _VERBOSITY_TO_TARGET_LENGTH.get(verbosity, "MEDIUM"),
+        "emotional_state": "neutral",
+        "tone_tags": ["cooperative"],
+        "key_points_to_reveal": [],
+        "key_points_to_avoid": [],
+        "patient_instruction": _DEFAULT_PATIENT_INSTRUCTION,
+    }
+
+
 def parse_patient_manager_output(
     text: str,
     base_voice_style: Dict[str, str],
@@ -334,64 +462,20 @@ def parse_patient_manager_output(
         - key_points_to_avoid: list of strings
         - patient_instruction: str
     """
-    # Default values based on voice_style
-    verbosity = base_voice_style.get("verbosity", "moderate")
-    trust = base_voice_style.get("trust", "neutral")
-    
-    # Map verbosity to target_length
-    if verbosity == "terse":
-        default_length = "SHORT"
-    elif verbosity == "detailed":
-        default_length = "LONG"
-    else:
-        default_length = "MEDIUM"
-    
-    # Map trust to directness
-    if trust == "guarded":
-        default_directness = "LOW"
-    elif trust == "open":
-        default_directness = "HIGH"
-    else:
-        default_directness = "MED"
-    
-    defaults = {
-        "directness": default_directness,
-        "disclosure_stage": current_disclosure_state,
-        "target_length": default_length,
-        "emotional_state": "neutral",
-        "tone_tags": ["cooperative"],
-        "key_points_to_reveal": [],
-        "key_points_to_avoid": [],
-        "patient_instruction": "Answer in a way consistent with your profile, moderately direct, and do not overshare."
-    }
-    
     try:
-        # Strip markdown code fences if present
-        cleaned = text.strip()
-        if cleaned.startswith("```json"):
-            cleaned = cleaned[7:]
-        if cleaned.startswith("```"):
-            cleaned = cleaned[3:]
-        if cleaned.endswith("```"):
-            cleaned = cleaned[:-3]
-        cleaned = cleaned.strip()
+        # Extract the JSON object (dropping any code fence or prose around it)
+        cleaned = extract_json_object(text)
         
-        parsed = json.loads(cleaned)
-        
-        # Fill in any missing fields with defaults
-        result = {
-            "directness": parsed.get("directness", defaults["directness"]),
-            "disclosure_stage": parsed.get("disclosure_stage", defaults["disclosure_stage"]),
-            "target_length": parsed.get("target_length", defaults["target_length"]),
-            "emotional_state": parsed.get("emotional_state", defaults["emotional_state"]),
-            "tone_tags": parsed.get("tone_tags", defaults["tone_tags"]),
-            "key_points_to_reveal": parsed.get("key_points_to_reveal", defaults["key_points_to_reveal"]),
-            "key_points_to_avoid": parsed.get("key_points_to_avoid", defaults["key_points_to_avoid"]),
-            "patient_instruction": parsed.get("patient_instruction", defaults["patient_instruction"])
-        }
-        
-        return result
+        parsed = loads_json(cleaned)
         
     except (json.JSONDecodeError, ValueError):
         # Return defaults if parsing fails
-        return defaults
+        return _default_patient_guidance(base_voice_style, current_disclosure_state)
+    
+    # Common case: every field present, so no defaults need building
+    if all(key in parsed for key in _PATIENT_GUIDANCE_KEYS):
+        return {key: parsed[key] for key in _PATIENT_GUIDANCE_KEYS}
+    
+    # Fill in any missing fields with defaults (keeping the canonical key order)
+    defaults = _default_patient_guidance(base_voice_style, current_disclosure_state)
+    return {key: parsed.get(key, defaults[key]) for key in _PATIENT_GUIDANCE_KEYS}
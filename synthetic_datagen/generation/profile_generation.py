@@ -2,7 +2,8 @@
 Pure functions for patient profile generation.
 """
 import random
-from typing import Dict, Any, Optional
+from itertools import accumulate
+from typing import Dict, Any, List, Optional, Tuple
 
 from synthetic_datagen.data.templates import BIG5_DEP_TEMPLATES, DSM5_DEPRESSION_SYMPTOMS
 from synthetic_datagen.data.pools import (
@@ -21,7 +22,99 @@ from synthetic_datagen.data.pools import (
     AGE_DEFAULT_WEIGHTS,
     AGE_WEIGHTS_BY_ROLE,
 )
-from synthetic_datagen.generation.background_writer import call_background_writer
+from synthetic_datagen.generation.background_writer import (
+    call_background_writer,
+    call_background_writer_async,
+    prepare_background_writer_input,
+    build_background_writer_batch_request,
+    build_background_writer_result,
+    build_background_writer_error,
+)
+from synthetic_datagen.utils.openai_batch import run_chat_completions_batch
+
+
+# Lookup tables derived from the static templates, built once at import rather
+# than on every sample_patient_profile call.
+_TEMPLATE_IDS = tuple(BIG5_DEP_TEMPLATES.keys())
+_NON_EMPHASIZED_BY_TEMPLATE: Dict[str, List[str]] = {
+    template_id: [
+        s for s in DSM5_DEPRESSION_SYMPTOMS
+        if s not in template["emphasized_symptoms"]
+    ]
+    for template_id, template in BIG5_DEP_TEMPLATES.items()
+}
+
+# Cumulative age weights per work role (and the default), accumulated once
+# rather than inside every rng.choices call
+_AGE_CUM_WEIGHTS_BY_ROLE: Dict[str, Tuple[float, ...]] = {
+    role: tuple(accumulate(weights)) for role, weights in AGE_WEIGHTS_BY_ROLE.items()
+}
+_AGE_DEFAULT_CUM_WEIGHTS: Tuple[float, ...] = tuple(accumulate(AGE_DEFAULT_WEIGHTS))
+
+# Cumulative weights for the other fixed weighted draws in sample_patient_profile
+# EPISODE_DENSITY_LEVELS: ULTRA_LOW (~10%), LOW (~25%), MED (~45%), HIGH (~20%)
+_EPISODE_DENSITY_CUM_WEIGHTS: Tuple[float, ...] = tuple(accumulate((1, 2.5, 4.5, 2)))
+# PATIENT_HUMOR_LEVELS: 60% none, 30% occasional, 10% frequent
+_HUMOR_CUM_WEIGHTS: Tuple[int, ...] = tuple(accumulate((6, 3, 1)))
+# INTENSITY_LEVELS: LOW, MED, HIGH
+_INTENSITY_CUM_WEIGHTS: Tuple[int, ...] = tuple(accumulate((3, 5, 2)))
+
+
+# ============================================================================
+# SYMPTOM FREQUENCY TABLES
+# ============================================================================
+
+# (frequency codes, cumulative weights) pairs. Passing cum_weights to
+# rng.choices skips re-accumulating the weights on every draw and consumes the
+# RNG exactly as weights= does, so seeded profiles are unchanged.
+FrequencyTable = Tuple[Tuple[str, ...], Tuple[int, ...]]
+
+
+def _frequency_table(codes: Tuple[str, ...], weights: Tuple[int, ...]) -> FrequencyTable:
+    """Pair frequency codes with the cumulative form of their integer weights."""
+    return codes, tuple(accumulate(weights))
+
+
+# Emphasized symptoms, keyed by intensity level
+_EMPHASIZED_FREQUENCIES: Dict[str, FrequencyTable] = {
+    "LOW": _frequency_table(("RARE", "SOME", "OFTEN"), (5, 4, 1)),
+    "MED": _frequency_table(("SOME", "OFTEN", "RARE"), (5, 4, 1)),
+    "HIGH": _frequency_table(("SOME", "OFTEN"), (2, 8)),
+}
+
+# Non-emphasized symptoms selected in ULTRA_LOW mode (lighter elevation)
+_ULTRA_LOW_ELEVATED_FREQUENCIES = _frequency_table(("RARE", "SOME", "OFTEN"), (5, 3, 2))
+
+# Extra-high (secondary emphasized) symptoms
+_EXTRA_HIGH_FREQUENCIES = _frequency_table(("RARE", "SOME", "OFTEN"), (2, 5, 3))
+
+# Remaining non-emphasized symptoms, keyed by episode density (MED is the default)
+_NON_EMPHASIZED_FREQUENCIES: Dict[str, FrequencyTable] = {
+    "LOW": _frequency_table(("NONE", "RARE", "SOME"), (7, 2, 1)),
+    "MED": _frequency_table(("NONE", "RARE", "SOME"), (5, 3, 2)),
+    "HIGH": _frequency_table(("NONE", "RARE", "SOME"), (3, 3, 4)),
+}
+
+
+def _draw_frequency(rng: random.Random, table: FrequencyTable) -> str:
+    """Draw one frequency code from a precomputed table."""
+    codes, cum_weights = table
+    return rng.choices(codes, cum_weights=cum_weights, k=1)[0]
+
+
+def _sample_small(rng: random.Random, population: List[Any], k: int) -> List[Any]:
+    """
+    rng.sample for the common k <= 1 case without copying the population.
+    
+    k=0 draws nothing and k=1 draws one index below len(population), exactly
+    as rng.sample does, so seeded results are unchanged; larger k defers to
+    rng.sample.
+    """
+    if k == 0:
+        return []
+    if k == 1:
+        return [population[rng.randrange(len(population))]]
+    return rng.sample(population, k=k)
 
 
 def generate_depression_profile(
@@ -30,6 +123,7 @@ def generate_depression_profile(
     episode_density: str,
     emph_intensity: Dict[str, str],
     extra_high: list,
+    non_emphasized: Optional[List[str]] = None,
 ) -> Dict[str, str]:
     """
     Generate depression symptom frequency profile based on template and parameters.
@@ -46,6 +140,10 @@ def generate_depression_profile(
         Mapping of emphasized symptom names to LOW/MED/HIGH intensity
     extra_high : list
         List of non-emphasized symptoms to elevate
+    non_emphasized : list, optional
+        DSM symptoms not emphasized by the template, in DSM order. Callers that
+        already hold the precomputed list pass it in; otherwise it is derived
+        from the template when needed.
         
     Returns
     -------
@@ -61,11 +159,14 @@ def generate_depression_profile(
         target_symptom_count = rng.choice([0, 1, 2])
         
         # Build candidate pool: prefer emphasized symptoms first
-        candidate_pool = list(emphasized)
+        # (template order, not set order, so the same seed gives the same profile
+        # regardless of PYTHONHASHSEED)
+        candidate_pool = list(template["emphasized_symptoms"])
         
         # If target exceeds emphasized symptoms, add non-emphasized
-        non_emphasized = [s for s in DSM5_DEPRESSION_SYMPTOMS if s not in emphasized]
         if target_symptom_count > len(candidate_pool):
+            if non_emphasized is None:
+                non_emphasized = [s for s in DSM5_DEPRESSION_SYMPTOMS if s not in emphasized]
             candidate_pool.extend(non_emphasized)
         
         # Select symptoms to be non-NONE
@@ -82,60 +183,35 @@ def generate_depression_profile(
         for symptom in selected_symptoms:
             if symptom in emphasized:
                 # Use intensity for emphasized symptoms
+                # (anything other than LOW/HIGH is treated as MED)
                 level = emph_intensity[symptom]
-                if level == "LOW":
-                    depression_profile[symptom] = rng.choices(
-                        ["RARE", "SOME", "OFTEN"], weights=[5, 4, 1], k=1
-                    )[0]
-                elif level == "HIGH":
-                    depression_profile[symptom] = rng.choices(
-                        ["SOME", "OFTEN"], weights=[2, 8], k=1
-                    )[0]
-                else:  # MED
-                    depression_profile[symptom] = rng.choices(
-                        ["SOME", "OFTEN", "RARE"], weights=[5, 4, 1], k=1
-                    )[0]
+                depression_profile[symptom] = _draw_frequency(
+                    rng, _EMPHASIZED_FREQUENCIES.get(level, _EMPHASIZED_FREQUENCIES["MED"])
+                )
             else:
                 # For non-emphasized: lighter elevation
-                depression_profile[symptom] = rng.choices(
-                    ["RARE", "SOME", "OFTEN"], weights=[5, 3, 2], k=1
-                )[0]
+                depression_profile[symptom] = _draw_frequency(rng, _ULTRA_LOW_ELEVATED_FREQUENCIES)
     else:
         # Standard density modes: original logic
-        # Define density-based weights for non-emphasized symptoms
-        if episode_density == "LOW":
-            non_emph_weights = (7, 2, 1)  # NONE, RARE, SOME
-        elif episode_density == "HIGH":
-            non_emph_weights = (3, 3, 4)
-        else:  # MED
-            non_emph_weights = (5, 3, 2)
+        # Density-based weights for non-emphasized symptoms (anything else is MED)
+        non_emph_table = _NON_EMPHASIZED_FREQUENCIES.get(
+            episode_density, _NON_EMPHASIZED_FREQUENCIES["MED"]
+        )
         
         for symptom in DSM5_DEPRESSION_SYMPTOMS:
             if symptom in emphasized:
                 # Apply intensity-based sampling for emphasized symptoms
+                # (anything other than LOW/HIGH is treated as MED)
                 level = emph_intensity[symptom]
-                if level == "LOW":
-                    depression_profile[symptom] = rng.choices(
-                        ["RARE", "SOME", "OFTEN"], weights=[5, 4, 1], k=1
-                    )[0]
-                elif level == "HIGH":
-                    depression_profile[symptom] = rng.choices(
-                        ["SOME", "OFTEN"], weights=[2, 8], k=1
-                    )[0]
-                else:  # MED
-                    depression_profile[symptom] = rng.choices(
-                        ["SOME", "OFTEN", "RARE"], weights=[5, 4, 1], k=1
-                    )[0]
+                depression_profile[symptom] = _draw_frequency(
+                    rng, _EMPHASIZED_FREQUENCIES.get(level, _EMPHASIZED_FREQUENCIES["MED"])
+                )
             elif symptom in extra_high:
                 # Treat as secondary emphasized (lighter elevation)
-                depression_profile[symptom] = rng.choices(
-                    ["RARE", "SOME", "OFTEN"], weights=[2, 5, 3], k=1
-                )[0]
+                depression_profile[symptom] = _draw_frequency(rng, _EXTRA_HIGH_FREQUENCIES)
             else:
                 # Non-emphasized: use density-based weights
-                depression_profile[symptom] = rng.choices(
-                    ["NONE", "RARE", "SOME"], weights=non_emph_weights, k=1
-                )[0]
+                depression_profile[symptom] = _draw_frequency(rng, non_emph_table)
     
     return depression_profile
 
@@ -172,7 +248,7 @@ def sample_patient_profile(rng: random.Random, forced: Optional[Dict[str, Any]]
     if "template_id" in forced:
         template_id = forced["template_id"]
     else:
-        template_id = rng.choice(list(BIG5_DEP_TEMPLATES.keys()))
+        template_id = rng.choice(_TEMPLATE_IDS)
     
     template = BIG5_DEP_TEMPLATES[template_id]
     
@@ -189,7 +265,7 @@ def sample_patient_profile(rng: random.Random, forced: Optional[Dict[str, Any]]
     if "modifiers" in forced:
         modifiers = forced["modifiers"]
     else:
-        modifiers = rng.sample(template["modifiers"], k=rng.randint(0, 2))
+        modifiers = _sample_small(rng, template["modifiers"], rng.randint(0, 2))
     personality["MODIFIERS"] = modifiers
     
     # Sample conversation pacing
@@ -204,7 +280,7 @@ def sample_patient_profile(rng: random.Random, forced: Optional[Dict[str, Any]]
         context_domains = forced["context_domains"]
     else:
         num_domains = rng.randint(0, MAX_CONTEXT_DOMAINS)
-        context_domains = rng.sample(GENERIC_CONTEXT_DOMAINS, k=num_domains)
+        context_domains = _sample_small(rng, GENERIC_CONTEXT_DOMAINS, num_domains)
     personality["CONTEXT_DOMAINS"] = context_domains
     
     # Sample episode density with ULTRA_LOW (~10%), LOW (~25%), MED (~45%), HIGH (~20%)
@@ -212,7 +288,7 @@ def sample_patient_profile(rng: random.Random, forced: Optional[Dict[str, Any]]
         episode_density = forced["episode_density"]
     else:
         episode_density = rng.choices(
-            EPISODE_DENSITY_LEVELS, weights=[1, 2.5, 4.5, 2], k=1
+            EPISODE_DENSITY_LEVELS, cum_weights=_EPISODE_DENSITY_CUM_WEIGHTS, k=1
         )[0]
     personality["EPISODE_DENSITY"] = episode_density
     
@@ -227,7 +303,7 @@ def sample_patient_profile(rng: random.Random, forced: Optional[Dict[str, Any]]
         # Add humor (weighted: 60% none, 30% occasional, 10% frequent)
         voice_style["humor"] = rng.choices(
             PATIENT_HUMOR_LEVELS,
-            weights=[6, 3, 1],
+            cum_weights=_HUMOR_CUM_WEIGHTS,
             k=1
         )[0]
     
@@ -252,7 +328,7 @@ def sample_patient_profile(rng: random.Random, forced: Optional[Dict[str, Any]]
         }
         # Drop 1-2 fields randomly so only 2-3 remain
         keys = list(personal_background.keys())
-        for k in rng.sample(keys, k=rng.randint(1, 2)):
+        for k in _sample_small(rng, keys, rng.randint(1, 2)):
             personal_background.pop(k)
     personality["PERSONAL_BACKGROUND"] = personal_background
     
@@ -261,33 +337,32 @@ def sample_patient_profile(rng: random.Random, forced: Optional[Dict[str, Any]]
         age_range = forced["age_range"]
     else:
         # Get role-appropriate age weights
-        age_weights = AGE_WEIGHTS_BY_ROLE.get(work_role, AGE_DEFAULT_WEIGHTS)
-        age_range = rng.choices(AGE_RANGES, weights=age_weights, k=1)[0]
+        age_cum_weights = _AGE_CUM_WEIGHTS_BY_ROLE.get(work_role, _AGE_DEFAULT_CUM_WEIGHTS)
+        age_range = rng.choices(AGE_RANGES, cum_weights=age_cum_weights, k=1)[0]
     personality["AGE_RANGE"] = age_range
     
-    # Sample intensity per emphasized symptom
-    emphasized = set(template["emphasized_symptoms"])
+    # Sample intensity per emphasized symptom (in template order for reproducibility)
     if "emph_intensity" in forced:
         emph_intensity = forced["emph_intensity"]
     else:
         emph_intensity = {}
-        for sym in emphasized:
+        for sym in template["emphasized_symptoms"]:
             emph_intensity[sym] = rng.choices(
-                INTENSITY_LEVELS, weights=[3, 5, 2], k=1
+                INTENSITY_LEVELS, cum_weights=_INTENSITY_CUM_WEIGHTS, k=1
             )[0]
     personality["EMPH_INTENSITY"] = emph_intensity
     
     # Select 0-1 non-emphasized symptoms for extra elevation
-    non_emphasized = [s for s in DSM5_DEPRESSION_SYMPTOMS if s not in emphasized]
+    non_emphasized = _NON_EMPHASIZED_BY_TEMPLATE[template_id]
     if "extra_elevated" in forced:
         extra_high = forced["extra_elevated"]
     else:
-        extra_high = rng.sample(non_emphasized, k=rng.randint(0, 1))
+        extra_high = _sample_small(rng, non_emphasized, rng.randint(0, 1))
     personality["EXTRA_ELEVATED_SYMPTOMS"] = extra_high
     
     # Generate depression profile
     depression_profile = generate_depression_profile(
-        rng, template, episode_density, emph_intensity, extra_high
+        rng, template, episode_density, emph_intensity, extra_high, non_emphasized
     )
     
     # Generate rich life background using background writer
@@ -314,3 +389,103 @@ def sample_patient_profile(rng: random.Random, forced: Optional[Dict[str, Any]]
         "life_background": life_background,
         "background_writer_prompt_trace": background_writer_prompt_trace,
     }
+
+
+async def sample_patient_profile_async(
+    rng: random.Random,
+    forced: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Async variant of sample_patient_profile for use inside a running event loop.
+    
+    Samples the profile synchronously (no LLM calls), then awaits the background
+    writer. RNG consumption order matches sample_patient_profile exactly.
+    
+    Parameters
+    ----------
+    rng : random.Random
+        Random number generator instance for reproducibility
+    forced : dict, optional
+        Same forced overrides accepted by sample_patient_profile
+        
+    Returns
+    -------
+    dict
+        Same structure as sample_patient_profile
+    """
+    forced = forced or {}
+    profile = sample_patient_profile(rng, forced={**forced, "skip_life_background": True})
+    
+    if not forced.get("skip_life_background"):
+        personality = profile["personality"]
+        bg_result = await call_background_writer_async(
+            rng=rng,
+            personality=personality,
+            depression_profile=profile["depression_profile"],
+            basic_background=personality["PERSONAL_BACKGROUND"],
+            context_domains=personality["CONTEXT_DOMAINS"],
+            age_range=personality["AGE_RANGE"],
+        )
+        profile["life_background"] = bg_result.get("background")
+        profile["background_writer_prompt_trace"] = bg_result.get("prompt_trace")
+    
+    return profile
+
+
+async def sample_patient_profiles_batch(
+    rngs: List[random.Random],
+    forced: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Sample one profile per RNG, generating all life backgrounds in a single Batch API job.
+    
+    Each profile consumes its RNG exactly as sample_patient_profile would, so a
+    batch run produces the same profiles as a live run with the same seeds.
+    
+    Parameters
+    ----------
+    rngs : list of random.Random
+        One RNG per profile
+    forced : dict, optional
+        Forced overrides applied to every profile
+        
+    Returns
+    -------
+    list
+        Profiles in the same order as rngs
+    """
+    forced = forced or {}
+    if forced.get("skip_life_background"):
+        return [sample_patient_profile(rng, forced=forced) for rng in rngs]
+    
+    profiles = []
+    writer_inputs = []
+    for rng in rngs:
+        profile = sample_patient_profile(rng, forced={**forced, "skip_life_background": True})
+        personality = profile["personality"]
+        writer_inputs.append(prepare_background_writer_input(
+            rng,
+            personality,
+            profile["depression_profile"],
+            personality["PERSONAL_BACKGROUND"],
+            personality["CONTEXT_DOMAINS"],
+            personality["AGE_RANGE"],
+        ))
+        profiles.append(profile)
+    
+    requests = [
+        build_background_writer_batch_request(f"profile-{i}", writer_input)
+        for i, writer_input in enumerate(writer_inputs)
+    ]
+    outputs = await run_chat_completions_batch(requests)
+    
+    for i, (profile, writer_input) in enumerate(zip(profiles, writer_inputs)):
+        output = outputs.get(f"profile-{i}")
+        if output is None:
+            bg_result = build_background_writer_error(writer_input, RuntimeError("no batch result"))
+        else:
+            bg_result = build_background_writer_result(writer_input, output)
+        profile["life_background"] = bg_result.get("background")
+        profile["background_writer_prompt_trace"] = bg_result.get("prompt_trace")
+    
+    return profiles
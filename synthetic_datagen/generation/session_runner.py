@@ -2,13 +2,16 @@
 Main session runner for doctor-patient dialogue generation.
 """
 import os
-import json
+import io
+import sys
 import random
+import time
 import hashlib
 import datetime
-from typing import Dict, Any, Optional, List
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Tuple
 
-from agents import Agent, ModelSettings, Runner, SQLiteSession
+from agents import Agent, ModelSettings
 from synthetic_datagen.config import (
     OPENAI_MODEL,
     DEFAULT_TEMPERATURE,
@@ -22,34 +25,24 @@ from synthetic_datagen.config import (
     MANAGER_MAX_TOKENS,
     DEFAULT_DOCTOR_PERSONA_ID,
     BUFFER_TURNS,
+    LOG_QUIET,
     LOG_MINIMAL,
     LOG_LIGHT,
     LOG_HEAVY,
 )
 
-
-def get_model_settings(max_tokens: int = 1000) -> ModelSettings:
-    """
-    Get ModelSettings appropriate for the current model.
-    
-    Note: gpt-5-mini does not support the temperature parameter.
-    For gpt-5-mini, we return None to omit model_settings entirely.
-    """
-    if OPENAI_MODEL == "gpt-5-mini":
-        # gpt-5-mini doesn't support temperature parameter - return None to use defaults
-        return None
-    else:
-        # Other models support temperature
-        return ModelSettings(temperature=DEFAULT_TEMPERATURE, max_tokens=max_tokens)
 from synthetic_datagen.data.templates import BIG5_DEP_TEMPLATES
 from synthetic_datagen.data.questionnaire import DSM_ITEMS
 from synthetic_datagen.prompts.doctor_personas import (
     DOCTOR_PERSONAS,
+    DOCTOR_PERSONAS_BY_ID,
     sample_doctor_microstyle,
     build_doctor_system_prompt,
 )
-from synthetic_datagen.generation.profile_generation import sample_patient_profile
+from synthetic_datagen.generation.profile_generation import sample_patient_profile_async
 from synthetic_datagen.generation.manager_logic import (
+    ConversationTranscript,
+    build_manager_header,
     build_manager_input,
     parse_doctor_manager_output,
     build_patient_manager_input,
@@ -62,33 +55,84 @@ from synthetic_datagen.prompts.doctor_manager_prompt import (
     DOCTOR_MANAGER_FORCE_DSM_SYSTEM_PROMPT,
 )
 from synthetic_datagen.prompts.patient_manager_prompt import PATIENT_MANAGER_SYSTEM_PROMPT
+from synthetic_datagen.utils.rate_limit import run_agent
+from synthetic_datagen.utils.io import write_json, JsonlTranscriptWriter
+from synthetic_datagen.utils.console import DISCARD, session_output, session_print
+
+
+# ============================================================================
+# MODEL SETTINGS
+# ============================================================================
+
+@lru_cache(maxsize=None)
+def get_model_settings(max_tokens: int = 1000) -> ModelSettings:
+    """
+    Get ModelSettings appropriate for the current model.
+    
+    Note: gpt-5-mini does not support the temperature parameter.
+    For gpt-5-mini, we return None to omit model_settings entirely.
+    
+    Settings depend only on max_tokens (temperature comes from config), so one
+    instance per value is cached and shared by every agent and manager turn.
+    The Agents SDK copies settings when resolving a run, so the shared instance
+    is never mutated.
+    """
+    if OPENAI_MODEL == "gpt-5-mini":
+        # gpt-5-mini doesn't support temperature parameter - return None to use defaults
+        return None
+    else:
+        # Other models support temperature
+        return ModelSettings(temperature=DEFAULT_TEMPERATURE, max_tokens=max_tokens)
+
+
+# ============================================================================
+# DOCTOR DIRECTIVES
+# ============================================================================
+
+# Opening/closing tags wrapped around the manager's instruction in doctor input,
+# keyed by next_action
+DIRECTIVE_TAGS: Dict[str, Tuple[str, str]] = {
+    "DSM": ("<NEXT_QUESTION>\n", "\n</NEXT_QUESTION>"),
+    "FOLLOW_UP": ("<FOLLOW_UP>\n", "\n</FOLLOW_UP>"),
+    "RAPPORT": ("<RAPPORT>\n", "\n</RAPPORT>"),
+}
+
+# Instruction used when the manager gives none (or picks an invalid DSM key)
+DSM_FALLBACK_INSTRUCTIONS: Dict[str, str] = {
+    key: f"Ask about {key} in a natural, conversational way." for key in DSM_ITEMS
+}
 
 
 # ============================================================================
 # LOGGING HELPERS
 # ============================================================================
 
+# All console output goes through utils.console.session_print (imported above),
+# which writes to the current session's sink: a buffer when concurrent sessions
+# are buffered, nothing in quiet mode, stdout otherwise.
+
+
 def print_banner(text: str, char: str = "=", width: int = 80):
     """Print a banner with text centered."""
-    print()
-    print(char * width)
+    session_print()
+    session_print(char * width)
     padding = (width - len(text) - 2) // 2
-    print(f"{char}{' ' * padding}{text}{' ' * (width - padding - len(text) - 2)}{char}")
-    print(char * width)
-    print()
+    session_print(f"{char}{' ' * padding}{text}{' ' * (width - padding - len(text) - 2)}{char}")
+    session_print(char * width)
+    session_print()
 
 
 def print_section(title: str, width: int = 80):
     """Print a section header."""
-    print()
-    print("-" * width)
-    print(f"  {title}")
-    print("-" * width)
+    session_print()
+    session_print("-" * width)
+    session_print(f"  {title}")
+    session_print("-" * width)
 
 
 def print_subsection(title: str):
     """Print a subsection header."""
-    print(f"\n  >>> {title}")
+    session_print(f"\n  >>> {title}")
 
 
 def print_session_header(
@@ -104,135 +148,140 @@ def print_session_header(
     log_level: str,
 ):
     """Print comprehensive session header with all details."""
+    if log_level == LOG_QUIET:
+        return  # Nothing per-session in quiet mode
+    
     # Big separator for new session
-    print("\n" * 3)
-    print("=" * 80)
-    print("=" * 80)
+    session_print("\n" * 3)
+    session_print("=" * 80)
+    session_print("=" * 80)
     print_banner("NEW SESSION", "=", 80)
-    print("=" * 80)
-    print("=" * 80)
+    session_print("=" * 80)
+    session_print("=" * 80)
     
     # Doctor details
     print_section("DOCTOR PROFILE")
-    print(f"  Persona ID:     {doctor_persona_id}")
-    print(f"  Warmth:         {doctor_microstyle.get('warmth', 'N/A')}")
-    print(f"  Directness:     {doctor_microstyle.get('directness', 'N/A')}")
-    print(f"  Pacing:         {doctor_microstyle.get('pacing', 'N/A')}")
-    print(f"  Humor:          {doctor_microstyle.get('humor', 'N/A')}")
-    print(f"  Animation:      {doctor_microstyle.get('animation', 'N/A')}")
+    session_print(f"  Persona ID:     {doctor_persona_id}")
+    session_print(f"  Warmth:         {doctor_microstyle.get('warmth', 'N/A')}")
+    session_print(f"  Directness:     {doctor_microstyle.get('directness', 'N/A')}")
+    session_print(f"  Pacing:         {doctor_microstyle.get('pacing', 'N/A')}")
+    session_print(f"  Humor:          {doctor_microstyle.get('humor', 'N/A')}")
+    session_print(f"  Animation:      {doctor_microstyle.get('animation', 'N/A')}")
     
     # Patient details
     print_section("PATIENT PROFILE")
-    print(f"  Template ID:    {template_id}")
-    print(f"  Big Five:       {personality.get('BIG5_TEMPLATE', 'N/A')}")
-    print(f"  Specifier:      {personality.get('SPECIFIER_HINT', 'N/A')}")
+    session_print(f"  Template ID:    {template_id}")
+    session_print(f"  Big Five:       {personality.get('BIG5_TEMPLATE', 'N/A')}")
+    session_print(f"  Specifier:      {personality.get('SPECIFIER_HINT', 'N/A')}")
     
     vs = personality.get("VOICE_STYLE", {})
-    print(f"\n  Voice Style:")
-    print(f"    Verbosity:      {vs.get('verbosity', 'N/A')}")
-    print(f"    Expressiveness: {vs.get('expressiveness', 'N/A')}")
-    print(f"    Trust:          {vs.get('trust', 'N/A')}")
-    print(f"    Intellect:      {vs.get('intellect', 'N/A')}")
-    print(f"    Humor:          {vs.get('humor', 'N/A')}")
-    
-    print(f"\n  Behavior:")
-    print(f"    Pacing:         {personality.get('PACING', 'N/A')}")
-    print(f"    Episode Density:{personality.get('EPISODE_DENSITY', 'N/A')}")
-    print(f"    Modifiers:      {personality.get('MODIFIERS', [])}")
-    print(f"    Context Domains:{personality.get('CONTEXT_DOMAINS', [])}")
+    session_print(f"\n  Voice Style:")
+    session_print(f"    Verbosity:      {vs.get('verbosity', 'N/A')}")
+    session_print(f"    Expressiveness: {vs.get('expressiveness', 'N/A')}")
+    session_print(f"    Trust:          {vs.get('trust', 'N/A')}")
+    session_print(f"    Intellect:      {vs.get('intellect', 'N/A')}")
+    session_print(f"    Humor:          {vs.get('humor', 'N/A')}")
+    
+    session_print(f"\n  Behavior:")
+    session_print(f"    Pacing:         {personality.get('PACING', 'N/A')}")
+    session_print(f"    Episode Density:{personality.get('EPISODE_DENSITY', 'N/A')}")
+    session_print(f"    Modifiers:      {personality.get('MODIFIERS', [])}")
+    session_print(f"    Context Domains:{personality.get('CONTEXT_DOMAINS', [])}")
     
     # Personal background
     personal_bg = personality.get("PERSONAL_BACKGROUND", {})
     if personal_bg:
-        print(f"\n  Personal Background:")
+        session_print(f"\n  Personal Background:")
         for key, val in personal_bg.items():
-            print(f"    {key}: {val}")
+            session_print(f"    {key}: {val}")
     
     # Life background (rich detail)
     if life_background:
         print_section("LIFE BACKGROUND")
-        print(f"  Name:           {life_background.name}")
-        print(f"  Age Range:      {life_background.age_range}")
-        print(f"  Pronouns:       {life_background.pronouns}")
-        print(f"  Core Roles:     {', '.join(life_background.core_roles) if life_background.core_roles else 'N/A'}")
+        session_print(f"  Name:           {life_background.name}")
+        session_print(f"  Age Range:      {life_background.age_range}")
+        session_print(f"  Pronouns:       {life_background.pronouns}")
+        session_print(f"  Core Roles:     {', '.join(life_background.core_roles) if life_background.core_roles else 'N/A'}")
         
         if life_background.core_relationships:
-            print(f"\n  Key Relationships:")
+            session_print(f"\n  Key Relationships:")
             for rel in life_background.core_relationships:
-                print(f"    • {rel}")
+                session_print(f"    • {rel}")
         
-        print(f"\n  Core Stressors:")
-        print(f"    {life_background.core_stressor_summary}")
+        session_print(f"\n  Core Stressors:")
+        session_print(f"    {life_background.core_stressor_summary}")
         
         # Life facets by salience
         high_sal = [f for f in life_background.life_facets if f.salience == "high"]
         med_sal = [f for f in life_background.life_facets if f.salience == "med"]
         
         if high_sal:
-            print(f"\n  High-Salience Life Facets:")
+            session_print(f"\n  High-Salience Life Facets:")
             for facet in high_sal:
-                print(f"    [{facet.category}]")
+                session_print(f"    [{facet.category}]")
                 # Wrap long descriptions
                 desc = facet.description
                 while len(desc) > 70:
-                    print(f"      {desc[:70]}")
+                    session_print(f"      {desc[:70]}")
                     desc = desc[70:]
-                print(f"      {desc}")
+                session_print(f"      {desc}")
         
         if med_sal:
-            print(f"\n  Medium-Salience Life Facets:")
+            session_print(f"\n  Medium-Salience Life Facets:")
             for facet in med_sal:
-                print(f"    [{facet.category}]")
+                session_print(f"    [{facet.category}]")
                 desc = facet.description
                 while len(desc) > 70:
-                    print(f"      {desc[:70]}")
+                    session_print(f"      {desc[:70]}")
                     desc = desc[70:]
-                print(f"      {desc}")
+                session_print(f"      {desc}")
     
     # Depression profile
     print_section("DEPRESSION PROFILE (Ground Truth)")
-    print(f"  Emphasized Symptoms: {template.get('emphasized_symptoms', [])}")
-    print()
+    session_print(f"  Emphasized Symptoms: {template.get('emphasized_symptoms', [])}")
+    session_print()
     for symptom, freq in depression_profile.items():
         indicator = "██" if freq in ["SOME", "OFTEN"] else "░░" if freq == "RARE" else "  "
-        print(f"  {indicator} {symptom}: {freq}")
+        session_print(f"  {indicator} {symptom}: {freq}")
     
     # Pacing info
     print_section("PACING CONFIGURATION")
-    print(f"  Target turns/symptom: {target_turns_per_symptom}")
-    print(f"  Max doctor turns:     {max_doctor_turns}")
-    print(f"  DSM items to cover:   {NUM_DSM_ITEMS}")
+    session_print(f"  Target turns/symptom: {target_turns_per_symptom}")
+    session_print(f"  Max doctor turns:     {max_doctor_turns}")
+    session_print(f"  DSM items to cover:   {NUM_DSM_ITEMS}")
     
     # Start interview section
-    print()
-    print("=" * 80)
+    session_print()
+    session_print("=" * 80)
     print_banner("INTERVIEW BEGIN", "=", 80)
-    print("=" * 80)
+    session_print("=" * 80)
 
 
 def print_doctor_turn_header(turn_num: int, mode: str, ratio: float = None, target: float = None, log_level: str = LOG_LIGHT):
     """Print doctor turn header based on log level."""
+    if log_level == LOG_QUIET:
+        return  # No per-turn output in quiet
     if log_level == LOG_MINIMAL:
-        print(f"\n--- Turn {turn_num} ---")
+        session_print(f"\n--- Turn {turn_num} ---")
     elif log_level == LOG_LIGHT:
         if ratio is not None:
-            print(f"\n--- Doctor Turn {turn_num} [{mode.upper()}] (ratio={ratio:.2f}, target={target}) ---")
+            session_print(f"\n--- Doctor Turn {turn_num} [{mode.upper()}] (ratio={ratio:.2f}, target={target}) ---")
         else:
-            print(f"\n--- Doctor Turn {turn_num} [{mode.upper()}] ---")
+            session_print(f"\n--- Doctor Turn {turn_num} [{mode.upper()}] ---")
     else:  # HEAVY
-        print()
-        print("=" * 80)
+        session_print()
+        session_print("=" * 80)
         if ratio is not None:
-            print(f"  DOCTOR TURN {turn_num} | Mode: {mode.upper()} | Ratio: {ratio:.2f} | Target: {target}")
+            session_print(f"  DOCTOR TURN {turn_num} | Mode: {mode.upper()} | Ratio: {ratio:.2f} | Target: {target}")
         else:
-            print(f"  DOCTOR TURN {turn_num} | Mode: {mode.upper()}")
-        print("=" * 80)
+            session_print(f"  DOCTOR TURN {turn_num} | Mode: {mode.upper()}")
+        session_print("=" * 80)
 
 
 def print_doctor_manager_decision(decision: Dict[str, Any], log_level: str):
     """Print doctor manager decision based on log level."""
-    if log_level == LOG_MINIMAL:
-        return  # No manager output in minimal
+    if log_level in (LOG_QUIET, LOG_MINIMAL):
+        return  # No manager output in quiet/minimal
     
     next_action = decision.get("next_action", "N/A")
     reason = decision.get("reason", "N/A")
@@ -240,116 +289,119 @@ def print_doctor_manager_decision(decision: Dict[str, Any], log_level: str):
     dsm_key = decision.get("dsm_symptom_key", "")
     
     if log_level == LOG_LIGHT:
-        print(f"  Manager: {next_action}" + (f" → {dsm_key}" if dsm_key else ""))
-        print(f"  Reason: {reason}")
-        print(f"  Instruction: {instruction[:100]}..." if len(instruction) > 100 else f"  Instruction: {instruction}")
+        session_print(f"  Manager: {next_action}" + (f" → {dsm_key}" if dsm_key else ""))
+        session_print(f"  Reason: {reason}")
+        session_print(f"  Instruction: {instruction[:100]}..." if len(instruction) > 100 else f"  Instruction: {instruction}")
     else:  # HEAVY
         print_subsection("DOCTOR MANAGER DECISION")
-        print(f"    Next Action:    {next_action}")
+        session_print(f"    Next Action:    {next_action}")
         if dsm_key:
-            print(f"    DSM Symptom:    {dsm_key}")
-        print(f"    Reason:         {reason}")
-        print(f"    Instruction:")
+            session_print(f"    DSM Symptom:    {dsm_key}")
+        session_print(f"    Reason:         {reason}")
+        session_print(f"    Instruction:")
         # Wrap instruction
         inst = instruction
         while len(inst) > 70:
-            print(f"      {inst[:70]}")
+            session_print(f"      {inst[:70]}")
             inst = inst[70:]
-        print(f"      {inst}")
+        session_print(f"      {inst}")
 
 
 def print_patient_turn_header(turn_num: int, log_level: str):
     """Print patient turn header based on log level."""
-    if log_level == LOG_MINIMAL:
-        return  # Handled in main output
+    if log_level in (LOG_QUIET, LOG_MINIMAL):
+        return  # Handled in main output (none in quiet)
     elif log_level == LOG_LIGHT:
-        print(f"\n--- Patient Turn {turn_num} ---")
+        session_print(f"\n--- Patient Turn {turn_num} ---")
     else:  # HEAVY
-        print()
-        print("-" * 80)
-        print(f"  PATIENT TURN {turn_num}")
-        print("-" * 80)
+        session_print()
+        session_print("-" * 80)
+        session_print(f"  PATIENT TURN {turn_num}")
+        session_print("-" * 80)
 
 
 def print_patient_manager_guidance(guidance: Dict[str, Any], ground_truth_note: str, log_level: str):
     """Print patient manager guidance based on log level."""
-    if log_level == LOG_MINIMAL:
-        return  # No manager output in minimal
+    if log_level in (LOG_QUIET, LOG_MINIMAL):
+        return  # No manager output in quiet/minimal
     
     if log_level == LOG_LIGHT:
-        print(f"  Disclosure: {guidance.get('disclosure_stage', 'N/A')} | Length: {guidance.get('target_length', 'N/A')}")
-        print(f"  Instruction: {guidance.get('patient_instruction', 'N/A')[:100]}..." if len(guidance.get('patient_instruction', '')) > 100 else f"  Instruction: {guidance.get('patient_instruction', 'N/A')}")
+        session_print(f"  Disclosure: {guidance.get('disclosure_stage', 'N/A')} | Length: {guidance.get('target_length', 'N/A')}")
+        session_print(f"  Instruction: {guidance.get('patient_instruction', 'N/A')[:100]}..." if len(guidance.get('patient_instruction', '')) > 100 else f"  Instruction: {guidance.get('patient_instruction', 'N/A')}")
         if ground_truth_note:
-            print(f"  {ground_truth_note}")
+            session_print(f"  {ground_truth_note}")
     else:  # HEAVY
         print_subsection("PATIENT MANAGER GUIDANCE")
-        print(f"    Directness:       {guidance.get('directness', 'N/A')}")
-        print(f"    Disclosure Stage: {guidance.get('disclosure_stage', 'N/A')}")
-        print(f"    Target Length:    {guidance.get('target_length', 'N/A')}")
-        print(f"    Emotional State:  {guidance.get('emotional_state', 'N/A')}")
-        print(f"    Tone Tags:        {guidance.get('tone_tags', [])}")
+        session_print(f"    Directness:       {guidance.get('directness', 'N/A')}")
+        session_print(f"    Disclosure Stage: {guidance.get('disclosure_stage', 'N/A')}")
+        session_print(f"    Target Length:    {guidance.get('target_length', 'N/A')}")
+        session_print(f"    Emotional State:  {guidance.get('emotional_state', 'N/A')}")
+        session_print(f"    Tone Tags:        {guidance.get('tone_tags', [])}")
         
         if guidance.get('key_points_to_reveal'):
-            print(f"    Key Points to Reveal:")
+            session_print(f"    Key Points to Reveal:")
             for point in guidance.get('key_points_to_reveal', []):
-                print(f"      • {point}")
+                session_print(f"      • {point}")
         
         if guidance.get('key_points_to_avoid'):
-            print(f"    Key Points to Avoid:")
+            session_print(f"    Key Points to Avoid:")
             for point in guidance.get('key_points_to_avoid', []):
-                print(f"      • {point}")
+                session_print(f"      • {point}")
         
-        print(f"    Instruction:")
+        session_print(f"    Instruction:")
         inst = guidance.get('patient_instruction', 'N/A')
         while len(inst) > 70:
-            print(f"      {inst[:70]}")
+            session_print(f"      {inst[:70]}")
             inst = inst[70:]
-        print(f"      {inst}")
+        session_print(f"      {inst}")
         
         if ground_truth_note:
-            print(f"\n    {ground_truth_note}")
+            session_print(f"\n    {ground_truth_note}")
 
 
 def print_dialogue_line(speaker: str, text: str, log_level: str):
     """Print a dialogue line based on log level."""
+    if log_level == LOG_QUIET:
+        return  # No per-turn output in quiet
     if log_level == LOG_MINIMAL:
-        print(f"\n{speaker.upper()}: {text}")
+        session_print(f"\n{speaker.upper()}: {text}")
     elif log_level == LOG_LIGHT:
-        print(f"\n  {speaker.capitalize()}: {text}")
+        session_print(f"\n  {speaker.capitalize()}: {text}")
     else:  # HEAVY
         print_subsection(f"{speaker.upper()} SAYS")
         # Wrap text
         remaining = text
         while len(remaining) > 70:
-            print(f"    {remaining[:70]}")
+            session_print(f"    {remaining[:70]}")
             remaining = remaining[70:]
-        print(f"    {remaining}")
+        session_print(f"    {remaining}")
 
 
 def print_token_summary(token_usage: Dict[str, Dict[str, int]], log_level: str):
     """Print token usage summary."""
-    if log_level == LOG_MINIMAL:
-        return  # No token summary in minimal
+    if log_level in (LOG_QUIET, LOG_MINIMAL):
+        return  # No token summary in quiet/minimal
     
-    print()
-    print("=" * 80)
+    session_print()
+    session_print("=" * 80)
     print_banner("TOKEN USAGE SUMMARY", "=", 80)
-    print("=" * 80)
+    session_print("=" * 80)
     
     total_tokens = sum(agent["total_tokens"] for agent in token_usage.values())
     total_input = sum(agent["input_tokens"] for agent in token_usage.values())
+    total_cached = sum(agent.get("cached_input_tokens", 0) for agent in token_usage.values())
     total_output = sum(agent["output_tokens"] for agent in token_usage.values())
     
     for agent_name, usage in token_usage.items():
-        print(f"  {agent_name}:")
-        print(f"    Input:  {usage['input_tokens']:,} tokens")
-        print(f"    Output: {usage['output_tokens']:,} tokens")
-        print(f"    Total:  {usage['total_tokens']:,} tokens")
-    
-    print(f"\n  GRAND TOTAL:")
-    print(f"    Input:  {total_input:,} tokens")
-    print(f"    Output: {total_output:,} tokens")
-    print(f"    Total:  {total_tokens:,} tokens")
+        session_print(f"  {agent_name}:")
+        session_print(f"    Input:  {usage['input_tokens']:,} tokens ({usage.get('cached_input_tokens', 0):,} cached)")
+        session_print(f"    Output: {usage['output_tokens']:,} tokens")
+        session_print(f"    Total:  {usage['total_tokens']:,} tokens")
+    
+    session_print(f"\n  GRAND TOTAL:")
+    session_print(f"    Input:  {total_input:,} tokens ({total_cached:,} cached)")
+    session_print(f"    Output: {total_output:,} tokens")
+    session_print(f"    Total:  {total_tokens:,} tokens")
 
 
 # ============================================================================
@@ -385,6 +437,24 @@ def init_disclosure_state(personality: Dict[str, Any]) -> str:
         return "PARTIAL"
 
 
+def record_token_usage(agent_usage: Dict[str, int], result: Any) -> None:
+    """
+    Add a run result's token usage to one agent's running totals.
+    
+    Also records cached input tokens. OpenAI caches any prompt prefix that is
+    bit-identical to a recent request, so system prompts and the append-only
+    conversation are placed first and turn-varying content last.
+    """
+    if not (hasattr(result, 'context_wrapper') and hasattr(result.context_wrapper, 'usage')):
+        return
+    usage = result.context_wrapper.usage
+    agent_usage["input_tokens"] += usage.input_tokens
+    agent_usage["output_tokens"] += usage.output_tokens
+    agent_usage["total_tokens"] += usage.total_tokens
+    input_details = getattr(usage, "input_tokens_details", None)
+    agent_usage["cached_input_tokens"] += getattr(input_details, "cached_tokens", 0) or 0
+
+
 def build_doctor_manager_agent(system_prompt: str, model_settings: ModelSettings = None) -> Agent:
     """
     Return a stateful DoctorConversationManager agent.
@@ -470,16 +540,48 @@ def build_patient_manager_agent(model_settings: ModelSettings = None) -> Agent:
 # MAIN SESSION RUNNER
 # ============================================================================
 
-def run_patient_doctor_session(
+def write_details_index(output_dir: str = "outputs") -> Tuple[str, str]:
+    """
+    Write the template and doctor persona definitions referenced by transcripts.
+    
+    Transcripts generated with embed_details=False store only template_id and
+    persona_id; these files map those ids back to the full definitions.
+    
+    Parameters
+    ----------
+    output_dir : str
+        Directory to write templates_index.json and personas_index.json into
+        
+    Returns
+    -------
+    tuple
+        (templates index path, personas index path)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    templates_path = os.path.join(output_dir, "templates_index.json")
+    personas_path = os.path.join(output_dir, "personas_index.json")
+    write_json(templates_path, BIG5_DEP_TEMPLATES)
+    write_json(personas_path, DOCTOR_PERSONAS_BY_ID)
+    return templates_path, personas_path
+
+
+async def run_patient_doctor_session(
     *,
     rng: random.Random,
     use_random_agent: bool = False,
     forced_agent_profile: Optional[Dict[str, Any]] = None,
     log_level: str = LOG_LIGHT,
+    buffer_output: bool = False,
+    trace_writer: Optional[JsonlTranscriptWriter] = None,
+    raw_log_writer: Optional[JsonlTranscriptWriter] = None,
+    embed_details: bool = True,
 ) -> Dict[str, Any]:
     """
     Execute a multi-turn doctor-patient dialogue with stateful agents.
     
+    This is a coroutine so that many sessions can be driven concurrently
+    from a single event loop (see cli.run_sessions).
+    
     Parameters
     ----------
     rng : random.Random
@@ -489,31 +591,83 @@ def run_patient_doctor_session(
     forced_agent_profile : dict, optional
         Forced profile overrides for testing
     log_level : str
-        Logging verbosity: "minimal", "light", or "heavy"
+        Logging verbosity: "quiet", "minimal", "light", or "heavy"
+    buffer_output : bool
+        Collect this session's console output and write it in one block when
+        the session ends (keeps concurrent sessions from interleaving)
+    trace_writer : JsonlTranscriptWriter, optional
+        Shared JSONL sink for prompt traces; default is one JSON file per session
+    raw_log_writer : JsonlTranscriptWriter, optional
+        Shared JSONL sink for raw session logs; default is one JSON file per session
+    embed_details : bool
+        Include the full template and persona definitions in the session data.
+        If False, only template_id/persona_id are stored and the definitions are
+        looked up in the index files written by write_details_index
         
     Returns
     -------
     dict
         Session data with conversation, metadata, and ground truth
     """
-    # Step 3: Create sessions for conversational agents (doctor and patient are stateful)
-    doctor_session = SQLiteSession(":memory:")
-    patient_session = SQLiteSession(":memory:")
-    runner = Runner()
+    if not buffer_output and log_level != LOG_QUIET:
+        return await _run_patient_doctor_session(
+            rng=rng,
+            use_random_agent=use_random_agent,
+            forced_agent_profile=forced_agent_profile,
+            log_level=log_level,
+            trace_writer=trace_writer,
+            raw_log_writer=raw_log_writer,
+            embed_details=embed_details,
+        )
+    
+    buffer = io.StringIO()
+    token = session_output.set(DISCARD if log_level == LOG_QUIET else buffer)
+    try:
+        return await _run_patient_doctor_session(
+            rng=rng,
+            use_random_agent=use_random_agent,
+            forced_agent_profile=forced_agent_profile,
+            log_level=log_level,
+            trace_writer=trace_writer,
+            raw_log_writer=raw_log_writer,
+            embed_details=embed_details,
+        )
+    finally:
+        session_output.reset(token)
+        if buffer.tell():
+            sys.stdout.write(buffer.getvalue())
+            sys.stdout.flush()
+
+
+async def _run_patient_doctor_session(
+    *,
+    rng: random.Random,
+    use_random_agent: bool,
+    forced_agent_profile: Optional[Dict[str, Any]],
+    log_level: str,
+    trace_writer: Optional[JsonlTranscriptWriter],
+    raw_log_writer: Optional[JsonlTranscriptWriter],
+    embed_details: bool,
+) -> Dict[str, Any]:
+    """Session body for run_patient_doctor_session (all console output goes through session_print)."""
+    # Step 3: Server-side conversation state for the stateful doctor and patient agents.
+    # Each call sends only the new user message plus the id of that agent's previous
+    # response; OpenAI keeps the history, so the prompt is not re-sent every turn.
+    doctor_response_id: Optional[str] = None
+    patient_response_id: Optional[str] = None
     
     # Token usage tracking per agent
+    # cached_input_tokens counts input served from OpenAI's automatic prompt cache
     token_usage = {
-        "doctor": {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0},
-        "patient": {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0},
-        "doctor_manager": {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0},
-        "patient_manager": {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0},
+        agent_name: {"input_tokens": 0, "cached_input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        for agent_name in ("doctor", "patient", "doctor_manager", "patient_manager")
     }
     
     # Agent Profile Generation
     background_writer_prompt_trace = None  # Track background writer trace
     if use_random_agent or forced_agent_profile is None:
         # Sample patient profile using the RNG
-        profile = sample_patient_profile(rng)
+        profile = await sample_patient_profile_async(rng)
         template_id = profile["template_id"]
         template = profile["template"]
         personality = profile["personality"]
@@ -526,7 +680,7 @@ def run_patient_doctor_session(
         doctor_persona_id = doctor_persona["id"]
         
         # Sample per-session doctor microstyle
-        doctor_microstyle = sample_doctor_microstyle()
+        doctor_microstyle = sample_doctor_microstyle(rng)
     else:
         # Use forced profile
         template_id = forced_agent_profile["template_id"]
@@ -536,8 +690,8 @@ def run_patient_doctor_session(
         life_background = forced_agent_profile.get("life_background")
         background_writer_prompt_trace = forced_agent_profile.get("background_writer_prompt_trace")
         doctor_persona_id = forced_agent_profile.get("doctor_persona_id", DEFAULT_DOCTOR_PERSONA_ID)
-        doctor_persona = next((p for p in DOCTOR_PERSONAS if p["id"] == doctor_persona_id), DOCTOR_PERSONAS[0])
-        doctor_microstyle = forced_agent_profile.get("doctor_microstyle", sample_doctor_microstyle())
+        doctor_persona = DOCTOR_PERSONAS_BY_ID.get(doctor_persona_id, DOCTOR_PERSONAS[0])
+        doctor_microstyle = forced_agent_profile.get("doctor_microstyle") or sample_doctor_microstyle(rng)
     
     # Build patient system prompt
     patient_system_prompt = build_patient_system_prompt(
@@ -570,12 +724,16 @@ def run_patient_doctor_session(
         f"D_HUMOR={doctor_microstyle.get('humor', 'none')}",
         f"D_ANIMATION={doctor_microstyle.get('animation', 'med')}",
     ]
+    # Hash incrementally rather than building the full "|"-joined key string.
+    # Separators are fed exactly as the join would place them, so agent IDs
+    # are unchanged.
+    profile_hasher = hashlib.sha256(profile_key_parts[0].encode())
+    for part in profile_key_parts[1:]:
+        profile_hasher.update(f"|{part}".encode())
     # Add depression profile (symptom frequencies)
-    for symptom in sorted(depression_profile.keys()):
-        profile_key_parts.append(f"{symptom}={depression_profile[symptom]}")
-    
-    profile_key = "|".join(profile_key_parts)
-    agent_hash = hashlib.sha256(profile_key.encode()).hexdigest()[:16]
+    for symptom, freq_code in sorted(depression_profile.items()):
+        profile_hasher.update(f"|{symptom}={freq_code}".encode())
+    agent_hash = profile_hasher.hexdigest()[:16]
     agent_id = f"AGENT_{agent_hash}"
     
     # Session-level generation settings
@@ -676,6 +834,8 @@ def run_patient_doctor_session(
     
     # Dialogue loop initialization
     conversation_history: List[Dict[str, str]] = []
+    # Manager-facing rendering of conversation_history, extended as it grows
+    transcript = ConversationTranscript()
     dsm_pool = list(DSM_ITEMS)  # Copy of DSM symptom keys
     asked_question_order: List[str] = []
     patient_manager_decisions: List[Dict[str, Any]] = []  # Track patient manager decisions
@@ -693,21 +853,21 @@ def run_patient_doctor_session(
     doctor_first_greeting = doctor_persona["first_greeting"]
     
     # Print doctor greeting with consistent formatting
-    if log_level != LOG_MINIMAL:
-        print()
-        print("=" * 60)
-        print(f"  DOCTOR TURN 0 (GREETING)")
-        print("=" * 60)
+    if log_level not in (LOG_QUIET, LOG_MINIMAL):
+        session_print()
+        session_print("=" * 60)
+        session_print(f"  DOCTOR TURN 0 (GREETING)")
+        session_print("=" * 60)
     print_dialogue_line("doctor", doctor_first_greeting, log_level)
     
     conversation_history.append({"role": "assistant", "content": doctor_first_greeting})
     
     # Patient's first response - route through patient manager
-    if log_level != LOG_MINIMAL:
-        print()
-        print("-" * 60)
-        print(f"  PATIENT TURN 1")
-        print("-" * 60)
+    if log_level not in (LOG_QUIET, LOG_MINIMAL):
+        session_print()
+        session_print("-" * 60)
+        session_print(f"  PATIENT TURN 1")
+        session_print("-" * 60)
     
     # Build patient manager input for first response
     patient_manager_meta = {
@@ -722,23 +882,18 @@ def run_patient_doctor_session(
     pm_input_first = build_patient_manager_input(
         last_doctor_message=doctor_first_greeting,
         last_doctor_move="RAPPORT",  # Greeting is treated as RAPPORT
-        conversation_history=conversation_history,
+        conversation_context=transcript.render(conversation_history),
         patient_meta=patient_manager_meta,
         depression_profile=depression_profile,
         disclosure_state=disclosure_state,
     )
     
-    # Call patient manager with fresh session (stateless)
-    pm_session_first = SQLiteSession(":memory:")
-    pm_res_first = runner.run_sync(patient_manager_agent, pm_input_first, session=pm_session_first)
+    # Call patient manager (stateless: no session, full context is in the input)
+    pm_res_first = await run_agent(patient_manager_agent, pm_input_first)
     pm_output_first = pm_res_first.final_output
     
     # Track token usage
-    if hasattr(pm_res_first, 'context_wrapper') and hasattr(pm_res_first.context_wrapper, 'usage'):
-        usage = pm_res_first.context_wrapper.usage
-        token_usage["patient_manager"]["input_tokens"] += usage.input_tokens
-        token_usage["patient_manager"]["output_tokens"] += usage.output_tokens
-        token_usage["patient_manager"]["total_tokens"] += usage.total_tokens
+    record_token_usage(token_usage["patient_manager"], pm_res_first)
     
     # Log prompt trace
     prompt_traces.append({
@@ -756,11 +911,11 @@ def run_patient_doctor_session(
         current_disclosure_state=disclosure_state,
     )
     
-    if log_level != LOG_MINIMAL:
-        print("\n  [MANAGER GUIDANCE]")
-        print(f"    Disclosure: {guidance_first['disclosure_stage']} | Length: {guidance_first['target_length']}")
-        print(f"    Emotional: {guidance_first.get('emotional_state', 'neutral')}")
-        print(f"    Instruction: {guidance_first['patient_instruction']}")
+    if log_level not in (LOG_QUIET, LOG_MINIMAL):
+        session_print("\n  [MANAGER GUIDANCE]")
+        session_print(f"    Disclosure: {guidance_first['disclosure_stage']} | Length: {guidance_first['target_length']}")
+        session_print(f"    Emotional: {guidance_first.get('emotional_state', 'neutral')}")
+        session_print(f"    Instruction: {guidance_first['patient_instruction']}")
     
     # Update disclosure_state
     disclosure_state = guidance_first["disclosure_stage"]
@@ -788,19 +943,12 @@ DOCTOR_MESSAGE:
 """
     
     # Patient's turn with guidance
-    res = runner.run_sync(
-        patient_agent,
-        patient_input_first,
-        session=patient_session,
-    )
+    res = await run_agent(patient_agent, patient_input_first, previous_response_id=patient_response_id)
     patient_reply = res.final_output
+    patient_response_id = res.last_response_id
     
     # Track token usage
-    if hasattr(res, 'context_wrapper') and hasattr(res.context_wrapper, 'usage'):
-        usage = res.context_wrapper.usage
-        token_usage["patient"]["input_tokens"] += usage.input_tokens
-        token_usage["patient"]["output_tokens"] += usage.output_tokens
-        token_usage["patient"]["total_tokens"] += usage.total_tokens
+    record_token_usage(token_usage["patient"], res)
     
     # Log prompt trace
     prompt_traces.append({
@@ -815,13 +963,33 @@ DOCTOR_MESSAGE:
     conversation_history.append({"role": "user", "content": patient_reply})
     
     # Print pacing information
-    if log_level != LOG_MINIMAL:
-        print(f"\n{'=' * 60}")
-        print(f"PACING CONFIGURATION:")
-        print(f"  Target turns per symptom: {target_turns_per_symptom}")
-        print(f"  Max doctor turns (excl. greeting): {max_doctor_turns}")
-        print(f"  DSM items to cover: {NUM_DSM_ITEMS}")
-        print(f"{'=' * 60}\n")
+    if log_level not in (LOG_QUIET, LOG_MINIMAL):
+        session_print(f"\n{'=' * 60}")
+        session_print(f"PACING CONFIGURATION:")
+        session_print(f"  Target turns per symptom: {target_turns_per_symptom}")
+        session_print(f"  Max doctor turns (excl. greeting): {max_doctor_turns}")
+        session_print(f"  DSM items to cover: {NUM_DSM_ITEMS}")
+        session_print(f"{'=' * 60}\n")
+    
+    # Doctor manager metadata and persona style are fixed for the whole session,
+    # so build them once here rather than on every doctor turn
+    vs = personality.get("VOICE_STYLE", {})
+    patient_meta = {
+        "template_id": template_id,
+        "trust": vs.get("trust", "N/A"),
+        "verbosity": vs.get("verbosity", "N/A"),
+        "pacing": personality.get("PACING", "N/A"),
+        "modifiers": personality.get("MODIFIERS", []),
+        "episode_density": personality.get("EPISODE_DENSITY", "N/A"),
+        "warmth": doctor_microstyle.get("warmth", "N/A"),
+        "directness": doctor_microstyle.get("directness", "N/A"),
+        "microstyle_pacing": doctor_microstyle.get("pacing", "N/A"),
+        "patient_background": patient_background_summary,
+        "risk_summary": risk_summary,
+    }
+    doctor_persona_style = doctor_persona.get("system_prompt", "").split('\n')[0] if doctor_persona.get("system_prompt") else "professional primary-care physician"
+    # Opening of every doctor manager input (normal and post-DSM)
+    manager_header = build_manager_header(doctor_persona_id, doctor_persona_style, patient_meta)
     
     # Main dialogue loop (extra turns beyond greeting)
     while doctor_turns_elapsed < max_doctor_turns:
@@ -835,58 +1003,21 @@ DOCTOR_MESSAGE:
         # Check if DSM screening is complete
         if remaining_dsm_items == 0:
             # Post-DSM phase: use post-DSM manager
-            if log_level != LOG_MINIMAL:
-                print()
-                print("=" * 60)
-                print(f"  DOCTOR TURN {doctor_turns_elapsed + 1} (POST-DSM)")
-                print("=" * 60)
-                print("\n  [MANAGER GUIDANCE]")
-            
-            # Build patient metadata for post-DSM manager
-            vs = personality.get("VOICE_STYLE", {})
-            patient_meta = {
-                "template_id": template_id,
-                "trust": vs.get("trust", "N/A"),
-                "verbosity": vs.get("verbosity", "N/A"),
-                "pacing": personality.get("PACING", "N/A"),
-                "modifiers": personality.get("MODIFIERS", []),
-                "episode_density": personality.get("EPISODE_DENSITY", "N/A"),
-                "warmth": doctor_microstyle.get("warmth", "N/A"),
-                "directness": doctor_microstyle.get("directness", "N/A"),
-                "microstyle_pacing": doctor_microstyle.get("pacing", "N/A"),
-                "patient_background": patient_background_summary,
-                "risk_summary": risk_summary,
-            }
-            
-            # Get doctor persona style description
-            doctor_persona_style = doctor_persona.get("system_prompt", "").split('\n')[0] if doctor_persona.get("system_prompt") else "professional primary-care physician"
+            if log_level not in (LOG_QUIET, LOG_MINIMAL):
+                session_print()
+                session_print("=" * 60)
+                session_print(f"  DOCTOR TURN {doctor_turns_elapsed + 1} (POST-DSM)")
+                session_print("=" * 60)
+                session_print("\n  [MANAGER GUIDANCE]")
             
             # Build post-DSM manager input (no DSM list needed)
             from synthetic_datagen.prompts.doctor_manager_prompt import DOCTOR_MANAGER_POST_DSM_SYSTEM_PROMPT
             
-            post_dsm_manager_input = f"""Doctor persona:
-id: {doctor_persona_id}
-style: {doctor_persona_style}
-microstyle: warmth={patient_meta['warmth']}, directness={patient_meta['directness']}, pacing={patient_meta['microstyle_pacing']}
-
-Patient background: {patient_meta['patient_background']}
-Patient risk summary: {patient_meta['risk_summary']}
-
-Patient profile:
-template_id: {patient_meta['template_id']}
-trust: {patient_meta['trust']}
-verbosity: {patient_meta['verbosity']}
-pacing: {patient_meta['pacing']}
-modifiers: {patient_meta['modifiers']}
-episode_density: {patient_meta['episode_density']}
-
-Conversation so far:
-"""
-            conversation_context = "\n".join([
-                f"{'Doctor' if msg['role'] == 'assistant' else 'Patient'}: {msg['content']}"
-                for msg in conversation_history
-            ])
-            post_dsm_manager_input += conversation_context + "\n\n\nTask: Decide next_action and output JSON only."
+            conversation_context = transcript.render(conversation_history)
+            post_dsm_manager_input = (
+                manager_header + conversation_context
+                + "\n\n\nTask: Decide next_action and output JSON only."
+            )
             
             # Build post-DSM doctor manager agent
             from synthetic_datagen.generation.manager_logic import parse_post_dsm_manager_output
@@ -897,16 +1028,11 @@ Conversation so far:
             )
             
             # Call post-DSM manager
-            post_dsm_session = SQLiteSession(":memory:")
-            post_dsm_result = runner.run_sync(post_dsm_manager, post_dsm_manager_input, session=post_dsm_session)
+            post_dsm_result = await run_agent(post_dsm_manager, post_dsm_manager_input)
             post_dsm_output = post_dsm_result.final_output
             
             # Track token usage
-            if hasattr(post_dsm_result, 'context_wrapper') and hasattr(post_dsm_result.context_wrapper, 'usage'):
-                usage = post_dsm_result.context_wrapper.usage
-                token_usage["doctor_manager"]["input_tokens"] += usage.input_tokens
-                token_usage["doctor_manager"]["output_tokens"] += usage.output_tokens
-                token_usage["doctor_manager"]["total_tokens"] += usage.total_tokens
+            record_token_usage(token_usage["doctor_manager"], post_dsm_result)
             
             # Log prompt trace
             prompt_traces.append({
@@ -923,10 +1049,10 @@ Conversation so far:
             reason = post_dsm_decision["reason"]
             doctor_instruction = post_dsm_decision["doctor_instruction"]
             
-            if log_level != LOG_MINIMAL:
-                print(f"    Action: {next_action}")
-                print(f"    Reason: {reason}")
-                print(f"    Instruction: {doctor_instruction}")
+            if log_level not in (LOG_QUIET, LOG_MINIMAL):
+                session_print(f"    Action: {next_action}")
+                session_print(f"    Reason: {reason}")
+                session_print(f"    Instruction: {doctor_instruction}")
             
             # Store decision
             doctor_manager_decisions.append({
@@ -951,35 +1077,17 @@ Conversation so far:
         elif remaining_total_turns <= remaining_dsm_items:
             # DSM coverage enforcement: force DSM when no slack (uses total turns including buffer)
             # Use FORCE_DSM prompt to get smooth transitions instead of hardcoded instructions
-            if log_level != LOG_MINIMAL:
-                print()
-                print("=" * 60)
-                print(f"  DOCTOR TURN {doctor_turns_elapsed + 1} (FORCE-DSM)")
-                print(f"  [Coverage guard: remaining_turns={remaining_total_turns} <= remaining_dsm={remaining_dsm_items}]")
-                print("=" * 60)
-                print("\n  [MANAGER GUIDANCE]")
+            if log_level not in (LOG_QUIET, LOG_MINIMAL):
+                session_print()
+                session_print("=" * 60)
+                session_print(f"  DOCTOR TURN {doctor_turns_elapsed + 1} (FORCE-DSM)")
+                session_print(f"  [Coverage guard: remaining_turns={remaining_total_turns} <= remaining_dsm={remaining_dsm_items}]")
+                session_print("=" * 60)
+                session_print("\n  [MANAGER GUIDANCE]")
             
             # Pick next DSM symptom key
             dsm_symptom_key = dsm_pool[0]  # Take first remaining
             
-            # Build input for FORCE_DSM manager
-            vs = personality.get("VOICE_STYLE", {})
-            patient_meta = {
-                "template_id": template_id,
-                "trust": vs.get("trust", "N/A"),
-                "verbosity": vs.get("verbosity", "N/A"),
-                "pacing": personality.get("PACING", "N/A"),
-                "modifiers": personality.get("MODIFIERS", []),
-                "episode_density": personality.get("EPISODE_DENSITY", "N/A"),
-                "warmth": doctor_microstyle.get("warmth", "N/A"),
-                "directness": doctor_microstyle.get("directness", "N/A"),
-                "microstyle_pacing": doctor_microstyle.get("pacing", "N/A"),
-                "patient_background": patient_background_summary,
-                "risk_summary": risk_summary,
-            }
-            
-            doctor_persona_style = doctor_persona.get("system_prompt", "").split('\n')[0] if doctor_persona.get("system_prompt") else "professional primary-care physician"
-            
             force_dsm_input = f"""Doctor persona:
 id: {doctor_persona_id}
 style: {doctor_persona_style}
@@ -1004,16 +1112,11 @@ Task: Provide guidance for how this doctor would smoothly transition to asking a
                 DOCTOR_MANAGER_FORCE_DSM_SYSTEM_PROMPT,
                 get_model_settings(MANAGER_MAX_TOKENS)
             )
-            force_dsm_session = SQLiteSession(":memory:")
-            force_dsm_result = runner.run_sync(force_dsm_manager, force_dsm_input, session=force_dsm_session)
+            force_dsm_result = await run_agent(force_dsm_manager, force_dsm_input)
             force_dsm_output = force_dsm_result.final_output
             
             # Track token usage
-            if hasattr(force_dsm_result, 'context_wrapper') and hasattr(force_dsm_result.context_wrapper, 'usage'):
-                usage = force_dsm_result.context_wrapper.usage
-                token_usage["doctor_manager"]["input_tokens"] += usage.input_tokens
-                token_usage["doctor_manager"]["output_tokens"] += usage.output_tokens
-                token_usage["doctor_manager"]["total_tokens"] += usage.total_tokens
+            record_token_usage(token_usage["doctor_manager"], force_dsm_result)
             
             # Log prompt trace
             prompt_traces.append({
@@ -1025,15 +1128,15 @@ Task: Provide guidance for how this doctor would smoothly transition to asking a
             })
             
             # Parse output
-            force_dsm_decision = parse_doctor_manager_output(force_dsm_output, dsm_pool)
+            force_dsm_decision = parse_doctor_manager_output(force_dsm_output, dsm_pool, rng)
             next_action = "DSM"  # Always DSM in force mode
             reason = force_dsm_decision.get("reason", f"Forced DSM for {dsm_symptom_key}")
-            doctor_instruction = force_dsm_decision.get("doctor_instruction", f"Ask about {dsm_symptom_key} in a natural, conversational way.")
+            doctor_instruction = force_dsm_decision.get("doctor_instruction", DSM_FALLBACK_INSTRUCTIONS[dsm_symptom_key])
             
-            if log_level != LOG_MINIMAL:
-                print(f"    Action: {next_action}")
-                print(f"    DSM Key: {dsm_symptom_key}")
-                print(f"    Instruction: {doctor_instruction}")
+            if log_level not in (LOG_QUIET, LOG_MINIMAL):
+                session_print(f"    Action: {next_action}")
+                session_print(f"    DSM Key: {dsm_symptom_key}")
+                session_print(f"    Instruction: {doctor_instruction}")
             
             # Store forced decision
             doctor_manager_decisions.append({
@@ -1054,52 +1157,31 @@ Task: Provide guidance for how this doctor would smoothly transition to asking a
                 # Low-turns mode: behind schedule
                 manager_system_prompt = DOCTOR_MANAGER_LOW_TURNS_SYSTEM_PROMPT
                 manager_type = "low_turns"
-                if log_level != LOG_MINIMAL:
-                    print()
-                    print("=" * 60)
-                    print(f"  DOCTOR TURN {doctor_turns_elapsed + 1} (LOW-TURNS MODE)")
-                    print(f"  [ratio={ratio:.2f} < target={target_turns_per_symptom}]")
-                    print("=" * 60)
+                if log_level not in (LOG_QUIET, LOG_MINIMAL):
+                    session_print()
+                    session_print("=" * 60)
+                    session_print(f"  DOCTOR TURN {doctor_turns_elapsed + 1} (LOW-TURNS MODE)")
+                    session_print(f"  [ratio={ratio:.2f} < target={target_turns_per_symptom}]")
+                    session_print("=" * 60)
             else:
                 # Normal mode: on schedule or ahead
                 manager_system_prompt = DOCTOR_MANAGER_SYSTEM_PROMPT
                 manager_type = "normal"
-                if log_level != LOG_MINIMAL:
-                    print()
-                    print("=" * 60)
-                    print(f"  DOCTOR TURN {doctor_turns_elapsed + 1} (NORMAL)")
-                    print(f"  [ratio={ratio:.2f} >= target={target_turns_per_symptom}]")
-                    print("=" * 60)
+                if log_level not in (LOG_QUIET, LOG_MINIMAL):
+                    session_print()
+                    session_print("=" * 60)
+                    session_print(f"  DOCTOR TURN {doctor_turns_elapsed + 1} (NORMAL)")
+                    session_print(f"  [ratio={ratio:.2f} >= target={target_turns_per_symptom}]")
+                    session_print("=" * 60)
             
-            if log_level != LOG_MINIMAL:
-                print("\n  [MANAGER GUIDANCE]")
-            
-            # Build patient metadata for manager (Step 5: minimal context)
-            vs = personality.get("VOICE_STYLE", {})
-            patient_meta = {
-                "template_id": template_id,
-                "trust": vs.get("trust", "N/A"),
-                "verbosity": vs.get("verbosity", "N/A"),
-                "pacing": personality.get("PACING", "N/A"),
-                "modifiers": personality.get("MODIFIERS", []),
-                "episode_density": personality.get("EPISODE_DENSITY", "N/A"),
-                "warmth": doctor_microstyle.get("warmth", "N/A"),
-                "directness": doctor_microstyle.get("directness", "N/A"),
-                "microstyle_pacing": doctor_microstyle.get("pacing", "N/A"),
-                "patient_background": patient_background_summary,
-                "risk_summary": risk_summary,
-            }
-            
-            # Get doctor persona style description
-            doctor_persona_style = doctor_persona.get("system_prompt", "").split('\n')[0] if doctor_persona.get("system_prompt") else "professional primary-care physician"
+            if log_level not in (LOG_QUIET, LOG_MINIMAL):
+                session_print("\n  [MANAGER GUIDANCE]")
             
             # Build manager input
             manager_input = build_manager_input(
-                conversation_history,
+                transcript.render(conversation_history),
                 dsm_pool,
-                doctor_persona_id,
-                doctor_persona_style,
-                patient_meta,
+                manager_header,
                 remaining_dsm_turns,
             )
             
@@ -1115,17 +1197,12 @@ Task: Provide guidance for how this doctor would smoothly transition to asking a
                 get_model_settings(MANAGER_MAX_TOKENS)
             )
             
-            # Call doctor manager agent with fresh session (stateless)
-            manager_session = SQLiteSession(":memory:")
-            doctor_manager_result = runner.run_sync(current_doctor_manager, manager_input, session=manager_session)
+            # Call doctor manager agent (stateless: no session, full context is in the input)
+            doctor_manager_result = await run_agent(current_doctor_manager, manager_input)
             doctor_manager_output = doctor_manager_result.final_output
             
             # Track token usage
-            if hasattr(doctor_manager_result, 'context_wrapper') and hasattr(doctor_manager_result.context_wrapper, 'usage'):
-                usage = doctor_manager_result.context_wrapper.usage
-                token_usage["doctor_manager"]["input_tokens"] += usage.input_tokens
-                token_usage["doctor_manager"]["output_tokens"] += usage.output_tokens
-                token_usage["doctor_manager"]["total_tokens"] += usage.total_tokens
+            record_token_usage(token_usage["doctor_manager"], doctor_manager_result)
             
             # Log prompt trace
             prompt_traces.append({
@@ -1137,16 +1214,16 @@ Task: Provide guidance for how this doctor would smoothly transition to asking a
             })
             
             # Parse doctor manager decision (with fallbacks)
-            doctor_manager_decision = parse_doctor_manager_output(doctor_manager_output, dsm_pool)
+            doctor_manager_decision = parse_doctor_manager_output(doctor_manager_output, dsm_pool, rng)
             next_action = doctor_manager_decision["next_action"]
             reason = doctor_manager_decision["reason"]
             doctor_instruction = doctor_manager_decision["doctor_instruction"]
             dsm_symptom_key = doctor_manager_decision["dsm_symptom_key"]
             
-            if log_level != LOG_MINIMAL:
-                print(f"    Action: {next_action}" + (f" → {dsm_symptom_key}" if dsm_symptom_key else ""))
-                print(f"    Reason: {reason}")
-                print(f"    Instruction: {doctor_instruction}")
+            if log_level not in (LOG_QUIET, LOG_MINIMAL):
+                session_print(f"    Action: {next_action}" + (f" → {dsm_symptom_key}" if dsm_symptom_key else ""))
+                session_print(f"    Reason: {reason}")
+                session_print(f"    Instruction: {doctor_instruction}")
             
             # Store doctor manager decision
             doctor_manager_decisions.append({
@@ -1170,21 +1247,16 @@ Task: Provide guidance for how this doctor would smoothly transition to asking a
                 asked_question_order.append(dsm_symptom_key)
             else:
                 # Fallback if invalid
-                if log_level != LOG_MINIMAL:
-                    print(f"Warning: Doctor manager selected invalid DSM key '{dsm_symptom_key}'. Using fallback.")
+                if log_level not in (LOG_QUIET, LOG_MINIMAL):
+                    session_print(f"Warning: Doctor manager selected invalid DSM key '{dsm_symptom_key}'. Using fallback.")
                 if dsm_pool:
-                    dsm_symptom_key = dsm_pool[0]
-                    dsm_pool.remove(dsm_symptom_key)
+                    dsm_symptom_key = dsm_pool.pop(0)
                     asked_question_order.append(dsm_symptom_key)
-                    doctor_instruction = f"Ask about {dsm_symptom_key} in a natural, conversational way."
-            
-            directive_tag_block = f"<NEXT_QUESTION>\n{doctor_instruction}\n</NEXT_QUESTION>"
-            
-        elif next_action == "FOLLOW_UP":
-            directive_tag_block = f"<FOLLOW_UP>\n{doctor_instruction}\n</FOLLOW_UP>"
-            
-        else:  # RAPPORT
-            directive_tag_block = f"<RAPPORT>\n{doctor_instruction}\n</RAPPORT>"
+                    doctor_instruction = DSM_FALLBACK_INSTRUCTIONS[dsm_symptom_key]
+        
+        # Anything other than DSM / FOLLOW_UP is treated as RAPPORT
+        open_tag, close_tag = DIRECTIVE_TAGS.get(next_action, DIRECTIVE_TAGS["RAPPORT"])
+        directive_tag_block = open_tag + doctor_instruction + close_tag
         
         # Build doctor input with explicit last patient message
         doctor_input = (
@@ -1194,15 +1266,12 @@ Task: Provide guidance for how this doctor would smoothly transition to asking a
         )
         
         # Doctor's turn
-        dr = runner.run_sync(doctor_agent, doctor_input, session=doctor_session)
+        dr = await run_agent(doctor_agent, doctor_input, previous_response_id=doctor_response_id)
         doctor_reply = dr.final_output
+        doctor_response_id = dr.last_response_id
         
         # Track token usage
-        if hasattr(dr, 'context_wrapper') and hasattr(dr.context_wrapper, 'usage'):
-            usage = dr.context_wrapper.usage
-            token_usage["doctor"]["input_tokens"] += usage.input_tokens
-            token_usage["doctor"]["output_tokens"] += usage.output_tokens
-            token_usage["doctor"]["total_tokens"] += usage.total_tokens
+        record_token_usage(token_usage["doctor"], dr)
         
         # Log prompt trace
         prompt_traces.append({
@@ -1219,42 +1288,28 @@ Task: Provide guidance for how this doctor would smoothly transition to asking a
         # Store last_doctor_move for patient manager
         last_doctor_move = next_action  # "DSM", "FOLLOW_UP", or "RAPPORT"
         
-        # P6: Build patient manager input
-        patient_manager_meta = {
-            "template_id": template_id,
-            "emphasized_symptoms": template.get("emphasized_symptoms", []),
-            "modifiers": personality.get("MODIFIERS", []),
-            "voice_style": personality.get("VOICE_STYLE", {}),
-            "pacing": personality.get("PACING", "MED"),
-            "episode_density": personality.get("EPISODE_DENSITY", "MED"),
-        }
-        
+        # P6: Build patient manager input (patient_manager_meta is fixed per session)
         pm_input = build_patient_manager_input(
             last_doctor_message=doctor_reply,
             last_doctor_move=last_doctor_move,
-            conversation_history=conversation_history,
+            conversation_context=transcript.render(conversation_history),
             patient_meta=patient_manager_meta,
             depression_profile=depression_profile,
             disclosure_state=disclosure_state,
         )
         
         # Call patient manager agent with fresh session (stateless)
-        if log_level != LOG_MINIMAL:
-            print()
-            print("-" * 60)
-            print(f"  PATIENT TURN {doctor_turns_elapsed}")
-            print("-" * 60)
-            print("\n  [MANAGER GUIDANCE]")
-        pm_session = SQLiteSession(":memory:")
-        pm_res = runner.run_sync(patient_manager_agent, pm_input, session=pm_session)
+        if log_level not in (LOG_QUIET, LOG_MINIMAL):
+            session_print()
+            session_print("-" * 60)
+            session_print(f"  PATIENT TURN {doctor_turns_elapsed}")
+            session_print("-" * 60)
+            session_print("\n  [MANAGER GUIDANCE]")
+        pm_res = await run_agent(patient_manager_agent, pm_input)
         pm_output_text = pm_res.final_output
         
         # Track token usage
-        if hasattr(pm_res, 'context_wrapper') and hasattr(pm_res.context_wrapper, 'usage'):
-            usage = pm_res.context_wrapper.usage
-            token_usage["patient_manager"]["input_tokens"] += usage.input_tokens
-            token_usage["patient_manager"]["output_tokens"] += usage.output_tokens
-            token_usage["patient_manager"]["total_tokens"] += usage.total_tokens
+        record_token_usage(token_usage["patient_manager"], pm_res)
         
         # Log prompt trace
         prompt_traces.append({
@@ -1278,12 +1333,12 @@ Task: Provide guidance for how this doctor would smoothly transition to asking a
             gt_severity = depression_profile.get(dsm_symptom_key, "N/A")
             ground_truth_note = f" [Ground Truth: {dsm_symptom_key} = {gt_severity}]"
         
-        if log_level != LOG_MINIMAL:
-            print(f"    Disclosure: {guidance['disclosure_stage']} | Length: {guidance['target_length']}")
-            print(f"    Emotional: {guidance.get('emotional_state', 'neutral')}")
-            print(f"    Instruction: {guidance['patient_instruction']}")
+        if log_level not in (LOG_QUIET, LOG_MINIMAL):
+            session_print(f"    Disclosure: {guidance['disclosure_stage']} | Length: {guidance['target_length']}")
+            session_print(f"    Emotional: {guidance.get('emotional_state', 'neutral')}")
+            session_print(f"    Instruction: {guidance['patient_instruction']}")
             if ground_truth_note:
-                print(f"    {ground_truth_note}")
+                session_print(f"    {ground_truth_note}")
         
         # Update disclosure_state
         disclosure_state = guidance["disclosure_stage"]
@@ -1311,15 +1366,12 @@ DOCTOR_MESSAGE:
 """
         
         # Patient's turn with guidance
-        pr = runner.run_sync(patient_agent, patient_input, session=patient_session)
+        pr = await run_agent(patient_agent, patient_input, previous_response_id=patient_response_id)
         patient_reply = pr.final_output
+        patient_response_id = pr.last_response_id
         
         # Track token usage
-        if hasattr(pr, 'context_wrapper') and hasattr(pr.context_wrapper, 'usage'):
-            usage = pr.context_wrapper.usage
-            token_usage["patient"]["input_tokens"] += usage.input_tokens
-            token_usage["patient"]["output_tokens"] += usage.output_tokens
-            token_usage["patient"]["total_tokens"] += usage.total_tokens
+        record_token_usage(token_usage["patient"], pr)
         
         # Log prompt trace
         prompt_traces.append({
@@ -1337,14 +1389,10 @@ DOCTOR_MESSAGE:
     if conversation_history[-1]["role"] == "user":
         final_msg = "Thank you for sharing. Is there anything else you'd like to discuss today?"
         print_dialogue_line("doctor", final_msg, log_level)
-        dr = runner.run_sync(doctor_agent, final_msg, session=doctor_session)
+        dr = await run_agent(doctor_agent, final_msg, previous_response_id=doctor_response_id)
         
         # Track token usage for final message
-        if hasattr(dr, 'context_wrapper') and hasattr(dr.context_wrapper, 'usage'):
-            usage = dr.context_wrapper.usage
-            token_usage["doctor"]["input_tokens"] += usage.input_tokens
-            token_usage["doctor"]["output_tokens"] += usage.output_tokens
-            token_usage["doctor"]["total_tokens"] += usage.total_tokens
+        record_token_usage(token_usage["doctor"], dr)
         
         conversation_history.append({"role": "assistant", "content": final_msg})
     
@@ -1383,8 +1431,16 @@ DOCTOR_MESSAGE:
         }
     
     # Build session data
+    # Nanosecond epoch timestamp is cheap to take and sorts as an integer;
+    # the ISO string is derived from it (utcnow() is deprecated since 3.12).
+    # Integer math truncates to the microsecond; going through a float
+    # (ns / 1e9) would round and could land 1us off run_timestamp_utc_ns.
+    run_timestamp_ns = time.time_ns()
     session_data = {
-        "run_timestamp_utc": datetime.datetime.utcnow().isoformat(),
+        "run_timestamp_utc": datetime.datetime.fromtimestamp(
+            run_timestamp_ns // 10**9, datetime.timezone.utc
+        ).replace(microsecond=run_timestamp_ns // 1000 % 10**6).isoformat(),
+        "run_timestamp_utc_ns": run_timestamp_ns,
         "agent_id": agent_id,
         "template_id": template_id,
         "template_details": template,
@@ -1406,60 +1462,67 @@ DOCTOR_MESSAGE:
         "conversation": readable_conversation,
         "raw_conversation": conversation_history,
     }
-    
-    # Save prompt traces to separate file
-    trace_dir = "outputs/prompt_traces"
-    os.makedirs(trace_dir, exist_ok=True)
-    trace_fname = os.path.join(trace_dir, f"prompttrace_{agent_id}.json")
-    
-    with open(trace_fname, "w", encoding="utf-8") as f:
-        json.dump({
-            "agent_id": agent_id,
-            "prompt_traces": prompt_traces,
-        }, f, indent=2)
+    if not embed_details:
+        # Static definitions are identical across sessions; store them once per
+        # run in the index files instead of in every transcript
+        del session_data["template_details"]
+        del session_data["persona_details"]
+    
+    # Save prompt traces (separate file per session, or one line in a shared JSONL)
+    trace_data = {
+        "agent_id": agent_id,
+        "prompt_traces": prompt_traces,
+    }
+    if trace_writer is not None:
+        trace_fname = trace_writer.write(trace_data)
+    else:
+        trace_dir = "outputs/prompt_traces"
+        os.makedirs(trace_dir, exist_ok=True)
+        trace_fname = os.path.join(trace_dir, f"prompttrace_{agent_id}.json")
+        write_json(trace_fname, trace_data)
     
     session_data["prompt_trace_file"] = trace_fname
     
-    # Save raw log file with full details
-    log_dir = "outputs/logs"
-    os.makedirs(log_dir, exist_ok=True)
-    log_fname = os.path.join(log_dir, f"session_{agent_id}_raw.json")
-    
+    # Save raw log with full details (same layout choice as the prompt traces)
     raw_log_data = {
         "agent_id": agent_id,
         "session_data": session_data,
         "prompt_traces": prompt_traces,
     }
-    
-    with open(log_fname, "w", encoding="utf-8") as f:
-        json.dump(raw_log_data, f, indent=2)
+    if raw_log_writer is not None:
+        log_fname = raw_log_writer.write(raw_log_data)
+    else:
+        log_dir = "outputs/logs"
+        os.makedirs(log_dir, exist_ok=True)
+        log_fname = os.path.join(log_dir, f"session_{agent_id}_raw.json")
+        write_json(log_fname, raw_log_data)
     
     session_data["raw_log_file"] = log_fname
     session_data["token_usage"] = token_usage
     
     # Print token usage summary
-    if log_level != LOG_MINIMAL:
-        print(f"\n{'=' * 60}")
-        print("=== TOKEN USAGE SUMMARY ===")
-        print(f"{'=' * 60}")
+    if log_level not in (LOG_QUIET, LOG_MINIMAL):
+        session_print(f"\n{'=' * 60}")
+        session_print("=== TOKEN USAGE SUMMARY ===")
+        session_print(f"{'=' * 60}")
         total_tokens = sum(agent["total_tokens"] for agent in token_usage.values())
         total_input = sum(agent["input_tokens"] for agent in token_usage.values())
+        total_cached = sum(agent["cached_input_tokens"] for agent in token_usage.values())
         total_output = sum(agent["output_tokens"] for agent in token_usage.values())
         
         for agent_name, usage in token_usage.items():
-            print(f"{agent_name}:")
-            print(f"  Input:  {usage['input_tokens']:,} tokens")
-            print(f"  Output: {usage['output_tokens']:,} tokens")
-            print(f"  Total:  {usage['total_tokens']:,} tokens")
+            session_print(f"{agent_name}:")
+            session_print(f"  Input:  {usage['input_tokens']:,} tokens ({usage['cached_input_tokens']:,} cached)")
+            session_print(f"  Output: {usage['output_tokens']:,} tokens")
+            session_print(f"  Total:  {usage['total_tokens']:,} tokens")
         
-        print(f"\nGrand Total:")
-        print(f"  Input:  {total_input:,} tokens")
-        print(f"  Output: {total_output:,} tokens")
-        print(f"  Total:  {total_tokens:,} tokens")
-        print(f"{'=' * 60}")
+        session_print(f"\nGrand Total:")
+        session_print(f"  Input:  {total_input:,} tokens ({total_cached:,} cached)")
+        session_print(f"  Output: {total_output:,} tokens")
+        session_print(f"  Total:  {total_tokens:,} tokens")
+        session_print(f"{'=' * 60}")
         
-        print(f"\nSession complete: {agent_id}")
-        print(f"Transcript: outputs/transcripts/transcript_{agent_id}.json")
-        print(f"Raw log: {log_fname}")
+        session_print(f"\nSession complete: {agent_id}")
+        session_print(f"Raw log: {log_fname}")
     
     return session_data
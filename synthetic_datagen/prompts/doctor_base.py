@@ -5,37 +5,11 @@ from typing import Optional
 from synthetic_datagen.data.life_background import PatientLifeBackground
 
 
-def build_doctor_base_prompt(life_background: Optional[PatientLifeBackground] = None) -> str:
-    """
-    Build doctor base system prompt with optional patient snapshot.
-    
-    Parameters
-    ----------
-    life_background : PatientLifeBackground, optional
-        Patient life background for context
-        
-    Returns
-    -------
-    str
-        Complete doctor base prompt
-    """
-    base = """You are a primary-care doctor conducting a depression screening interview with a patient.
+# Instructions shared by every doctor agent. Kept free of per-session content so
+# it forms a common prompt prefix across sessions (OpenAI prompt caching).
+DOCTOR_BASE_INSTRUCTIONS = """You are a primary-care doctor conducting a depression screening interview with a patient.
 
-This is a roleplay simulation. Your goal is to embody your assigned persona authentically while gathering clinical information. Be the doctor—speak naturally as that character would, with their unique voice, mannerisms, and approach."""
-    
-    # Add patient snapshot if available
-    if life_background:
-        base += f"""
-
-Patient snapshot:
-- Name: {life_background.name}
-- Age: {life_background.age_range}
-- Main roles: {", ".join(life_background.core_roles) if life_background.core_roles else "not specified"}
-- Key current stressors: {life_background.core_stressor_summary if life_background.core_stressor_summary else "not specified"}
-
-Reference this naturally when relevant."""
-    
-    base += """
+This is a roleplay simulation. Your goal is to embody your assigned persona authentically while gathering clinical information. Be the doctor—speak naturally as that character would, with their unique voice, mannerisms, and approach.
 
 IMPORTANT - EMBODY YOUR PERSONA:
 Your persona and microstyle define who you are. Lean into them fully:
@@ -74,7 +48,54 @@ PATIENT COMFORT:
 - Never dismiss or minimize concerns
 - Respect their pace on sensitive topics
 - Show empathy through your persona's lens"""
+
+
+def build_patient_snapshot(life_background: Optional[PatientLifeBackground] = None) -> str:
+    """
+    Build the patient snapshot section of the doctor prompt.
+    
+    Parameters
+    ----------
+    life_background : PatientLifeBackground, optional
+        Patient life background for context
+        
+    Returns
+    -------
+    str
+        Snapshot section, or "" if no background
+    """
+    if not life_background:
+        return ""
+    return f"""Patient snapshot:
+- Name: {life_background.name}
+- Age: {life_background.age_range}
+- Main roles: {", ".join(life_background.core_roles) if life_background.core_roles else "not specified"}
+- Key current stressors: {life_background.core_stressor_summary if life_background.core_stressor_summary else "not specified"}
+
+Reference this naturally when relevant."""
+
+
+def build_doctor_base_prompt(life_background: Optional[PatientLifeBackground] = None) -> str:
+    """
+    Build doctor base system prompt with optional patient snapshot.
+    
+    The snapshot is appended after the shared instructions so that the
+    instructions stay an identical prefix across sessions.
     
+    Parameters
+    ----------
+    life_background : PatientLifeBackground, optional
+        Patient life background for context
+        
+    Returns
+    -------
+    str
+        Complete doctor base prompt
+    """
+    base = DOCTOR_BASE_INSTRUCTIONS
+    snapshot = build_patient_snapshot(life_background)
+    if snapshot:
+        base += "\n\n" + snapshot
     return base
 
 
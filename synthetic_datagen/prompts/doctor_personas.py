@@ -1,8 +1,9 @@
 """
 Doctor personas and microstyle variation logic (no hard-coded reflections).
 """
+import random
 from typing import List, Dict, Any, Optional
-from synthetic_datagen.prompts.doctor_base import build_doctor_base_prompt
+from synthetic_datagen.prompts.doctor_base import DOCTOR_BASE_INSTRUCTIONS, build_patient_snapshot
 from synthetic_datagen.data.life_background import PatientLifeBackground
 
 # Doctor persona registry – different communication styles
@@ -95,6 +96,11 @@ Persona style:
     },
 ]
 
+# Persona lookup by id, built once so forced-persona sessions don't rescan the list
+DOCTOR_PERSONAS_BY_ID: Dict[str, Dict[str, Any]] = {
+    persona["id"]: persona for persona in DOCTOR_PERSONAS
+}
+
 # Microstyle slider options for per-session doctor variation
 MICROSTYLE_OPTIONS: Dict[str, List[str]] = {
     "warmth": ["low", "med", "high"],
@@ -105,27 +111,30 @@ MICROSTYLE_OPTIONS: Dict[str, List[str]] = {
 }
 
 
-def sample_doctor_microstyle() -> Dict[str, str]:
+def sample_doctor_microstyle(rng: Optional[random.Random] = None) -> Dict[str, str]:
     """
     Sample per-session microstyle sliders for doctor variation.
     Returns a dict with warmth, directness, pacing, humor, and animation levels.
     
     Humor and animation are weighted toward lower/moderate values since
     most professional medical conversations don't involve much humor.
+    
+    Pass the session RNG so the microstyle is reproducible from --seed;
+    without one the global random module is used.
     """
-    import random
+    rng = rng or random
     return {
-        "warmth": random.choice(MICROSTYLE_OPTIONS["warmth"]),
-        "directness": random.choice(MICROSTYLE_OPTIONS["directness"]),
-        "pacing": random.choice(MICROSTYLE_OPTIONS["pacing"]),
+        "warmth": rng.choice(MICROSTYLE_OPTIONS["warmth"]),
+        "directness": rng.choice(MICROSTYLE_OPTIONS["directness"]),
+        "pacing": rng.choice(MICROSTYLE_OPTIONS["pacing"]),
         # Humor weighted: 60% none, 30% light, 10% dry
-        "humor": random.choices(
+        "humor": rng.choices(
             MICROSTYLE_OPTIONS["humor"],
             weights=[6, 3, 1],
             k=1
         )[0],
         # Animation weighted: 40% reserved, 40% moderate, 20% animated
-        "animation": random.choices(
+        "animation": rng.choices(
             MICROSTYLE_OPTIONS["animation"],
             weights=[4, 4, 2],
             k=1
@@ -139,8 +148,8 @@ def build_doctor_system_prompt(
     life_background: Optional[PatientLifeBackground] = None
 ) -> str:
     """
-    Combine the base doctor instructions, persona style, and microstyle
-    into a single system prompt for the doctor agent.
+    Combine the base doctor instructions, persona style, microstyle, and
+    patient snapshot into a single system prompt for the doctor agent.
 
     Parameters
     ----------
@@ -156,9 +165,9 @@ def build_doctor_system_prompt(
     str
         Complete doctor system prompt.
     """
-    # Build base prompt with patient snapshot if available
-    base_prompt = build_doctor_base_prompt(life_background)
-    
+    # Order is most-shared to least-shared so sessions reuse the longest
+    # possible cached prefix: base instructions (all sessions), persona (all
+    # sessions with this persona), microstyle, then the per-patient snapshot.
     microstyle_section = (
         "\nSession microstyle:\n"
         f"- Warmth: {microstyle['warmth']}\n"
@@ -168,4 +177,8 @@ def build_doctor_system_prompt(
         f"- Animation: {microstyle['animation']}\n"
         "Embody this style consistently in tone and phrasing throughout the conversation.\n"
     )
-    return base_prompt + "\n" + persona_prompt.strip() + microstyle_section
+    prompt = DOCTOR_BASE_INSTRUCTIONS + "\n" + persona_prompt.strip() + microstyle_section
+    snapshot = build_patient_snapshot(life_background)
+    if snapshot:
+        prompt += "\n" + snapshot + "\n"
+    return prompt
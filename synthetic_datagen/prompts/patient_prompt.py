@@ -1,11 +1,73 @@
 """
 Patient system prompt builder.
 """
-from typing import Dict, Optional
-from synthetic_datagen.data.templates import FREQUENCY_CATEGORIES
+from typing import Dict, List, Optional, Tuple
+from synthetic_datagen.data.templates import DSM5_DEPRESSION_SYMPTOMS, FREQUENCY_CATEGORIES
 from synthetic_datagen.data.life_background import PatientLifeBackground
 
 
+# =============================================================================
+# PRECOMPUTED PROMPT FRAGMENTS
+# =============================================================================
+# Everything below is identical across patients, so it is built once at import
+# instead of being re-formatted on every call to build_patient_system_prompt.
+
+# Display labels for PERSONAL_BACKGROUND keys (e.g. "work_role" -> "Work Role").
+# Unknown keys (e.g. from forced overrides) fall back to formatting on the fly.
+_BACKGROUND_KEY_LABELS: Dict[str, str] = {
+    k: k.replace('_', ' ').title()
+    for k in ("living_situation", "work_role", "routine_stability", "support_level")
+}
+
+# Symptom summary bullet for every (symptom, frequency code) pair
+_SYMPTOM_LINES: Dict[Tuple[str, str], str] = {
+    (symptom, code): f"• {symptom} – {verbose}"
+    for symptom in DSM5_DEPRESSION_SYMPTOMS
+    for code, verbose in FREQUENCY_CATEGORIES.items()
+}
+
+_PACING_INSTRUCTIONS: Dict[str, str] = {
+    "LOW": "- Keep responses SHORT and MINIMAL. Only elaborate if directly asked for more details.",
+    "HIGH": "- Provide MORE SPONTANEOUS ELABORATION. Share context and details naturally, but still don't ask questions back.",
+    "MED": "- Provide answers with OCCASIONAL CONTEXT when relevant.",
+}
+
+_NO_MODIFIER_LINES: List[str] = ["• None selected"]
+_NO_DOMAIN_LINES: List[str] = ["• No clear trigger you can identify"]
+
+# Roleplay instructions, split around the per-patient pacing line
+_ROLEPLAY_HEAD: Tuple[str, ...] = (
+    "### Roleplay Instructions ###",
+    "",
+    "Be this patient—speak with their voice, mannerisms, and personality. Let your template, modifiers, and voice style shape everything: word choice, sentence length, how much you share, and how guarded or open you are.",
+    "",
+    "GUIDELINES:",
+    "- Answer the doctor's questions; do not ask your own",
+    "- Show your feelings through your words—let emotion come through in what you say and how you say it",
+    "- Draw on your life context and background naturally",
+)
+_ROLEPLAY_TAIL: Tuple[str, ...] = (
+    "- Vary your wording—avoid using the same phrases repeatedly",
+    "- If humor fits your personality, use it to cope or deflect",
+    "- Output ONLY your spoken words—no stage directions, parentheticals, or action descriptions",
+    "- Let the conversation tell your story—connect responses to what came before",
+)
+
+
+def _background_key_label(key: str) -> str:
+    label = _BACKGROUND_KEY_LABELS.get(key)
+    if label is None:
+        label = key.replace('_', ' ').title()
+    return label
+
+
+def _symptom_line(symptom: str, freq_code: str) -> str:
+    line = _SYMPTOM_LINES.get((symptom, freq_code))
+    if line is None:
+        line = f"• {symptom} – {FREQUENCY_CATEGORIES.get(freq_code, 'N/A')}"
+    return line
+
+
 def build_patient_system_prompt(
     *,
     personality: Dict[str, str],
@@ -63,36 +125,31 @@ def build_patient_system_prompt(
     if modifiers:
         modifier_lines = [f"• {mod}" for mod in modifiers]
     else:
-        modifier_lines = ["• None selected"]
+        modifier_lines = _NO_MODIFIER_LINES
 
     # -- Assemble depression symptom summary ---------------------------
-    dep_lines = []
-    for symptom, freq_code in depression_profile.items():
-        freq_verbose = FREQUENCY_CATEGORIES.get(freq_code, "N/A")
-        dep_lines.append(f"• {symptom} – {freq_verbose}")
+    dep_lines = [
+        _symptom_line(symptom, freq_code)
+        for symptom, freq_code in depression_profile.items()
+    ]
 
     # -- Assemble context domains --------------------------------------
     context_domains = personality.get('CONTEXT_DOMAINS', [])
     if context_domains:
         domain_lines = [f"• {domain}" for domain in context_domains]
     else:
-        domain_lines = ["• No clear trigger you can identify"]
+        domain_lines = _NO_DOMAIN_LINES
 
     # -- Assemble personal background ----------------------------------
     background = personality.get('PERSONAL_BACKGROUND', {})
     if background:
-        bg_lines = [f"• {k.replace('_', ' ').title()}: {v}" for k, v in background.items()]
+        bg_lines = [f"• {_background_key_label(k)}: {v}" for k, v in background.items()]
     else:
         bg_lines = []
 
     # -- Build pacing-specific instructions ---------------------------
     pacing = personality.get('PACING', 'MED')
-    if pacing == "LOW":
-        pacing_instruction = "- Keep responses SHORT and MINIMAL. Only elaborate if directly asked for more details."
-    elif pacing == "HIGH":
-        pacing_instruction = "- Provide MORE SPONTANEOUS ELABORATION. Share context and details naturally, but still don't ask questions back."
-    else:  # MED
-        pacing_instruction = "- Provide answers with OCCASIONAL CONTEXT when relevant."
+    pacing_instruction = _PACING_INSTRUCTIONS.get(pacing, _PACING_INSTRUCTIONS["MED"])
 
 
     # -- Glue everything into a single system prompt -------------------
@@ -175,19 +232,7 @@ def build_patient_system_prompt(
             "",
         ]
     
-    prompt_sections += [
-        "### Roleplay Instructions ###",
-        "",
-        "Be this patient—speak with their voice, mannerisms, and personality. Let your template, modifiers, and voice style shape everything: word choice, sentence length, how much you share, and how guarded or open you are.",
-        "",
-        "GUIDELINES:",
-        "- Answer the doctor's questions; do not ask your own",
-        "- Show your feelings through your words—let emotion come through in what you say and how you say it",
-        "- Draw on your life context and background naturally",
-        pacing_instruction,
-        "- Vary your wording—avoid using the same phrases repeatedly",
-        "- If humor fits your personality, use it to cope or deflect",
-        "- Output ONLY your spoken words—no stage directions, parentheticals, or action descriptions",
-        "- Let the conversation tell your story—connect responses to what came before",
-    ]
+    prompt_sections += _ROLEPLAY_HEAD
+    prompt_sections.append(pacing_instruction)
+    prompt_sections += _ROLEPLAY_TAIL
     return "\n".join(prompt_sections)
@@ -0,0 +1,32 @@
+"""
+Session-aware console output.
+
+Each concurrent session runs in its own asyncio task (and therefore its own
+context). When buffering is on, a session's output is collected in a
+per-session sink and written as one block when the session ends, instead of
+interleaving line by line with other sessions. In quiet mode the session
+runner's print helpers and log-level guards skip per-turn output before any
+of it is formatted; the sink is DISCARD so anything else printed during the
+session (e.g. warnings) is dropped too.
+
+Modules whose output belongs to a session (the session runner, and the
+background writer and rate limiter it calls into) call session_print instead
+of print, so their warnings land in the same block as the rest of that
+session's output.
+"""
+import builtins
+from contextvars import ContextVar
+from typing import Any
+
+DISCARD = object()
+session_output: ContextVar[Any] = ContextVar("session_output", default=None)
+
+
+def session_print(*args, **kwargs) -> None:
+    """print() that honours the current session's output sink."""
+    sink = session_output.get()
+    if sink is DISCARD:
+        return
+    if sink is not None and "file" not in kwargs:
+        kwargs["file"] = sink
+    builtins.print(*args, **kwargs)
@@ -3,7 +3,66 @@ I/O utilities for saving session transcripts.
 """
 import json
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+# orjson rejects non-str dict keys by default; stdlib json coerces them to strings.
+# OPT_NON_STR_KEYS keeps both encoders accepting the same data.
+_ORJSON_BASE_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+
+def write_json(path: str, data: Any) -> None:
+    """
+    Write data to path as indented JSON.
+    
+    Uses orjson (a C encoder, several times faster than stdlib json) when it
+    is installed; the output layout is the same either way.
+    """
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(data, option=_ORJSON_BASE_OPTIONS | orjson.OPT_INDENT_2))
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def dumps_json_line(data: Any) -> bytes:
+    """Serialize data as one compact UTF-8 JSON line, including the trailing newline."""
+    if orjson is not None:
+        return orjson.dumps(data, option=_ORJSON_BASE_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def extract_json_object(text: str) -> str:
+    """
+    Return the JSON object embedded in model output.
+    
+    Takes everything from the first "{" to the last "}", which drops a markdown
+    code fence (```json ... ```) as well as any prose the model put around the
+    object, in one forward and one backward scan. Text with no "{...}" span is
+    returned stripped, so parsing it fails just as it would have unsliced.
+    """
+    start = text.find("{")
+    end = text.rfind("}")
+    if start < 0 or end < start:
+        return text.strip()
+    return text[start:end + 1]
+
+
+def loads_json(data: Union[str, bytes]) -> Any:
+    """
+    Parse JSON text, using orjson when it is installed.
+    
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch
+    the same exception either way.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
 
 
 def save_transcript(session_data: Dict[str, Any], output_dir: str = "outputs/transcripts") -> str:
@@ -31,7 +90,44 @@ def save_transcript(session_data: Dict[str, Any], output_dir: str = "outputs/tra
     filepath = os.path.join(output_dir, filename)
     
     # Write transcript
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(session_data, f, indent=2)
+    write_json(filepath, session_data)
     
     return filepath
+
+
+class JsonlTranscriptWriter:
+    """
+    Append-only JSONL transcript sink shared by all sessions in a run.
+    
+    The file is opened once with a large write buffer and each session is
+    written as one compact JSON line (no indentation), then flushed so a
+    crash never loses a completed session.
+    
+    Parameters
+    ----------
+    path : str
+        JSONL file to append to (default: outputs/transcripts/transcripts.jsonl)
+    buffer_size : int
+        Write buffer size in bytes
+    """
+    
+    def __init__(self, path: str = "outputs/transcripts/transcripts.jsonl", buffer_size: int = 1 << 20):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._file = open(path, "ab", buffering=buffer_size)
+    
+    def write(self, session_data: Dict[str, Any]) -> str:
+        """Append one session as a JSON line and return the JSONL path."""
+        self._file.write(dumps_json_line(session_data))
+        self._file.flush()
+        return self.path
+    
+    def close(self) -> None:
+        """Flush and close the underlying file."""
+        self._file.close()
+    
+    def __enter__(self) -> "JsonlTranscriptWriter":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
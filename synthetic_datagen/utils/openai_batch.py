@@ -0,0 +1,108 @@
+"""
+OpenAI Batch API helpers for non-interactive requests.
+
+Batch jobs cost 50% less than synchronous calls and draw on a separate rate-limit
+pool, at the price of up to 24h turnaround. Only requests that do not depend on
+each other (e.g. one background writer call per session) can be batched.
+
+Submitted batch ids are journaled under BATCH_JOURNAL_DIR, keyed by a hash of
+the request file. Re-running with the same requests (same --seed) resumes the
+existing batch instead of submitting (and paying for) a new one.
+"""
+import asyncio
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from synthetic_datagen.utils.io import dumps_json_line, write_json
+from synthetic_datagen.utils.openai_client import get_openai_client
+
+# Terminal batch statuses (anything else is still in progress)
+BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# Where submitted batch ids are recorded for resuming interrupted runs
+BATCH_JOURNAL_DIR = "outputs/batches"
+
+
+def _batch_journal_path(jsonl: bytes) -> str:
+    """Journal file for a batch, keyed by the hash of its request file."""
+    return os.path.join(BATCH_JOURNAL_DIR, f"batch_{hashlib.sha256(jsonl).hexdigest()[:16]}.json")
+
+
+async def _resume_batch(client: Any, journal_path: str) -> Optional[Any]:
+    """Return the journaled batch if it can still produce results, else None."""
+    if not os.path.exists(journal_path):
+        return None
+    with open(journal_path, "r", encoding="utf-8") as f:
+        batch_id = json.load(f)["batch_id"]
+    batch = await client.batches.retrieve(batch_id)
+    if batch.status in BATCH_TERMINAL_STATUSES and batch.status != "completed":
+        print(f"Previous batch {batch_id} ended with status '{batch.status}'; resubmitting")
+        return None
+    print(f"Resuming batch {batch_id} (status: {batch.status})")
+    return batch
+
+
+async def run_chat_completions_batch(
+    requests: List[Dict[str, Any]],
+    poll_interval: float = 30.0,
+) -> Dict[str, str]:
+    """
+    Submit chat completion requests as one Batch API job and wait for the results.
+    
+    Parameters
+    ----------
+    requests : list
+        Batch request lines (custom_id, method, url, body) for /v1/chat/completions
+    poll_interval : float
+        Seconds between status checks
+        
+    Returns
+    -------
+    dict
+        Mapping of custom_id to the completion text. Requests that errored are
+        missing from the mapping.
+    """
+    # Batch calls are not wrapped by run_agent, so restore the SDK's own retries
+    client = get_openai_client().with_options(max_retries=2)
+    
+    # Serialize straight to bytes and join once (no intermediate str + encode copy)
+    jsonl = b"".join(dumps_json_line(request) for request in requests)
+    journal_path = _batch_journal_path(jsonl)
+    
+    batch = await _resume_batch(client, journal_path)
+    if batch is None:
+        batch_file = await client.files.create(file=("batch_input.jsonl", jsonl), purpose="batch")
+        batch = await client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        os.makedirs(BATCH_JOURNAL_DIR, exist_ok=True)
+        write_json(journal_path, {"batch_id": batch.id, "num_requests": len(requests)})
+        print(f"Submitted batch {batch.id} with {len(requests)} request(s)")
+    
+    while batch.status not in BATCH_TERMINAL_STATUSES:
+        await asyncio.sleep(poll_interval)
+        batch = await client.batches.retrieve(batch.id)
+        counts = batch.request_counts
+        if counts is not None:
+            print(f"  Batch {batch.id}: {batch.status} ({counts.completed}/{counts.total} done)")
+    
+    if batch.status != "completed" or not batch.output_file_id:
+        print(f"Warning: Batch {batch.id} ended with status '{batch.status}'")
+        return {}
+    
+    content = await client.files.content(batch.output_file_id)
+    results = {}
+    for line in content.text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        if response.get("status_code") != 200:
+            continue
+        results[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+    
+    return results
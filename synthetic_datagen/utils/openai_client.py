@@ -0,0 +1,60 @@
+"""
+Process-wide OpenAI client shared by every agent call.
+
+Without a default client the Agents SDK builds a fresh AsyncOpenAI (and with it
+a fresh connection pool) per run, so concurrent sessions keep paying TCP/TLS
+setup. One client with a keep-alive pool lets all sessions reuse connections.
+"""
+from typing import Optional
+
+import httpx
+from agents import set_default_openai_client
+from openai import AsyncOpenAI
+
+from synthetic_datagen import config
+
+# HTTP/2 multiplexing needs the optional `h2` package (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+_client: Optional[AsyncOpenAI] = None
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """
+    Return the shared AsyncOpenAI client, creating it on first use.
+
+    The client is also registered as the Agents SDK default, so Runner.run
+    calls go through the same connection pool. Its built-in retries are
+    disabled because run_agent already retries transient errors with backoff;
+    leaving both on would multiply attempts per call.
+    """
+    global _client
+    if _client is None:
+        http_client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=httpx.Timeout(
+                config.HTTP_TIMEOUT_SECONDS,
+                connect=config.HTTP_CONNECT_TIMEOUT_SECONDS,
+            ),
+        )
+        _client = AsyncOpenAI(http_client=http_client, max_retries=0)
+        set_default_openai_client(_client)
+    return _client
+
+
+async def close_openai_client() -> None:
+    """Close the shared client's connection pool (call before the event loop exits)."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,182 @@
+"""
+Request/token rate limiting for concurrent agent calls.
+
+Implements the dual token-bucket throttle from the OpenAI cookbook's parallel
+request processor: one bucket for requests per minute, one for tokens per minute,
+both refilled continuously. Calls wait for capacity instead of bursting into 429s.
+"""
+import asyncio
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Union
+
+from agents import Agent, Runner
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; fall back to a chars-per-token estimate
+    tiktoken = None
+
+from synthetic_datagen import config
+from synthetic_datagen.utils.openai_client import get_openai_client
+from synthetic_datagen.utils.console import session_print
+
+# Rough characters-per-token ratio used to estimate prompt size when tiktoken
+# is not installed
+CHARS_PER_TOKEN = 4
+
+# Tokenizer used by gpt-4o / gpt-4.1 / gpt-5 family models
+DEFAULT_TIKTOKEN_ENCODING = "o200k_base"
+
+# Transient API errors worth retrying (429s, timeouts, dropped connections, 5xx)
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+
+class RateLimiter:
+    """
+    Dual token-bucket limiter for requests per minute and tokens per minute.
+    
+    Buckets refill continuously based on elapsed time, so capacity drips back
+    at a steady rate rather than resetting once a minute.
+    """
+    
+    def __init__(self, max_requests_per_minute: float, max_tokens_per_minute: float):
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self.available_requests = max_requests_per_minute
+        self.available_tokens = max_tokens_per_minute
+        self._last_update = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self) -> None:
+        """Add capacity accrued since the last update, capped at the per-minute limits."""
+        now = time.monotonic()
+        elapsed = now - self._last_update
+        self._last_update = now
+        self.available_requests = min(
+            self.max_requests_per_minute,
+            self.available_requests + self.max_requests_per_minute * elapsed / 60.0,
+        )
+        self.available_tokens = min(
+            self.max_tokens_per_minute,
+            self.available_tokens + self.max_tokens_per_minute * elapsed / 60.0,
+        )
+    
+    async def acquire(self, tokens: int) -> None:
+        """
+        Wait until one request and `tokens` tokens are available, then consume them.
+        
+        Waiters are served in arrival order (the lock is held while waiting),
+        so a large request cannot be starved by a stream of small ones.
+        """
+        tokens = min(tokens, self.max_tokens_per_minute)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.available_requests >= 1 and self.available_tokens >= tokens:
+                    self.available_requests -= 1
+                    self.available_tokens -= tokens
+                    return
+                await asyncio.sleep(1 / 60)
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide limiter, creating it from config on first use."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter(
+            config.MAX_REQUESTS_PER_MINUTE,
+            config.MAX_TOKENS_PER_MINUTE,
+        )
+    return _rate_limiter
+
+
+_encoding: Any = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens in text with tiktoken if available, else estimate from length.
+    """
+    global _encoding
+    if tiktoken is None:
+        return len(text) // CHARS_PER_TOKEN
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.encoding_for_model(config.OPENAI_MODEL)
+        except KeyError:
+            _encoding = tiktoken.get_encoding(DEFAULT_TIKTOKEN_ENCODING)
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+@lru_cache(maxsize=256)
+def _count_instruction_tokens(instructions: str) -> int:
+    """Token count for an agent's system prompt (fixed per agent, so cached)."""
+    return count_tokens(instructions)
+
+
+def estimate_request_tokens(agent: Agent, agent_input: Union[str, List[Dict[str, str]]]) -> int:
+    """
+    Estimate the token cost of one agent call for rate limiting.
+    
+    Counts the system prompt and input (a string or a message list) plus the
+    output token cap. History held server-side (previous_response_id) is not
+    counted; the retry loop in run_agent absorbs the difference.
+    """
+    if isinstance(agent_input, str):
+        input_tokens = count_tokens(agent_input)
+    else:
+        input_tokens = sum(count_tokens(str(item.get("content", ""))) for item in agent_input)
+    prompt_tokens = _count_instruction_tokens(agent.instructions or "") + input_tokens
+    model_settings = getattr(agent, "model_settings", None)
+    max_tokens = getattr(model_settings, "max_tokens", None) or config.DEFAULT_MAX_TOKENS
+    return prompt_tokens + max_tokens
+
+
+async def run_agent(
+    agent: Agent,
+    agent_input: Union[str, List[Dict[str, str]]],
+    *,
+    previous_response_id: Optional[str] = None,
+) -> Any:
+    """
+    Run an agent through the shared rate limiter, retrying transient API errors.
+    
+    Parameters
+    ----------
+    agent : Agent
+        Agent to run
+    agent_input : str or list
+        User input for this call, or the full message history for agents
+        whose conversation state is kept by the caller
+    previous_response_id : str, optional
+        Id of this agent's previous response, to continue a conversation whose
+        history is stored server-side (only the new input is sent)
+        
+    Returns
+    -------
+    RunResult
+        Result from Runner.run
+    """
+    get_openai_client()  # registers the shared client with the Agents SDK
+    limiter = get_rate_limiter()
+    estimated_tokens = estimate_request_tokens(agent, agent_input)
+    
+    for attempt in range(config.RATE_LIMIT_MAX_ATTEMPTS):
+        await limiter.acquire(estimated_tokens)
+        try:
+            return await Runner.run(
+                agent,
+                agent_input,
+                previous_response_id=previous_response_id,
+            )
+        except RETRYABLE_ERRORS as e:
+            if attempt == config.RATE_LIMIT_MAX_ATTEMPTS - 1:
+                raise
+            # Exponential backoff: 1s, 2s, 4s, 8s, ...
+            session_print(f"Warning: {type(e).__name__} on attempt {attempt + 1}; retrying in {2 ** attempt}s")
+            await asyncio.sleep(2 ** attempt)
@@ -0,0 +1,102 @@
+"""
+Test script for required life-facet selection (no API key required).
+"""
+import random
+from collections import Counter
+
+from synthetic_datagen.data.pools import LIFE_FACET_CATEGORIES
+from synthetic_datagen.generation.background_writer import (
+    TRAUMA_ADVERSITY_FACETS,
+    TRAUMA_ADVERSITY_SET,
+    select_required_facets,
+)
+
+print("=" * 60)
+print("Testing Required Facet Selection")
+print("=" * 60)
+
+NUM_RUNS = 20000
+
+# Test the shape of the selection
+print("\n1. Testing select_required_facets() output shape:")
+
+sizes = Counter()
+max_trauma = 0
+for seed in range(2000):
+    for severity, domains in (
+        ("mild", []),
+        ("severe", []),
+        ("mild", ["grief/bereavement"]),
+        ("moderate", ["work/role strain", "health concern"]),
+    ):
+        facets = select_required_facets(random.Random(seed), domains, {}, severity)
+        assert 5 <= len(facets) <= 8, facets
+        assert len(set(facets)) == len(facets), facets
+        assert all(facet in LIFE_FACET_CATEGORIES for facet in facets), facets
+        trauma_count = sum(facet in TRAUMA_ADVERSITY_SET for facet in facets)
+        assert trauma_count <= 2, facets
+        max_trauma = max(max_trauma, trauma_count)
+        sizes[len(facets)] += 1
+
+assert set(sizes) == {5, 6, 7, 8}, sizes
+print("   ✓ 5-8 distinct known categories per selection")
+print(f"   ✓ At most 2 trauma/adversity facets (max seen: {max_trauma})")
+print(f"   Sizes: {dict(sorted(sizes.items()))}")
+
+# Same seed, same facets
+assert select_required_facets(random.Random(7), [], {}, "severe") == \
+    select_required_facets(random.Random(7), [], {}, "severe")
+print("   ✓ Deterministic for a given seed")
+
+# Test that the one-pass ranking matches sequential weighted draws
+print("\n2. Testing ranking against sequential weighted sampling:")
+
+
+def reference_selection(rng: random.Random, weights: dict) -> list:
+    """Draw 5-8 categories one at a time in proportion to weight, capping trauma at 2."""
+    pool = dict(weights)
+    selected = []
+    trauma_taken = 0
+    num_facets = rng.choice((5, 6, 7, 8))
+    while len(selected) < num_facets:
+        pick = rng.choices(list(pool), weights=list(pool.values()), k=1)[0]
+        del pool[pick]
+        selected.append(pick)
+        if pick in TRAUMA_ADVERSITY_SET:
+            trauma_taken += 1
+            if trauma_taken == 2:
+                for trauma_cat in TRAUMA_ADVERSITY_FACETS:
+                    pool.pop(trauma_cat, None)
+    return selected
+
+
+# With no context domains the weights are: 1.0 base, the two core stressor
+# categories fixed, and trauma/adversity facets scaled by severity
+for severity, trauma_scale in (("mild", 0.5), ("severe", 1.5)):
+    weights = {cat: 1.0 for cat in LIFE_FACET_CATEGORIES}
+    weights["current_primary_stressor"] = 4.0
+    weights["coping_style"] = 2.5
+    for trauma_cat in TRAUMA_ADVERSITY_FACETS:
+        weights[trauma_cat] *= trauma_scale
+
+    rng = random.Random(1)
+    observed = Counter()
+    for _ in range(NUM_RUNS):
+        observed.update(select_required_facets(rng, [], {}, severity))
+
+    rng = random.Random(2)
+    expected = Counter()
+    for _ in range(NUM_RUNS):
+        expected.update(reference_selection(rng, weights))
+
+    worst = max(
+        abs(observed[cat] - expected[cat]) / NUM_RUNS for cat in LIFE_FACET_CATEGORIES
+    )
+    assert worst < 0.03, (severity, worst)
+    print(f"   ✓ {severity}: inclusion rates match (max difference {worst:.3f})")
+    print(f"     current_primary_stressor: {observed['current_primary_stressor'] / NUM_RUNS:.2f} "
+          f"vs {expected['current_primary_stressor'] / NUM_RUNS:.2f}")
+
+print("\n" + "=" * 60)
+print("✓ All Facet Selection Tests Passed!")
+print("=" * 60)
@@ -4,7 +4,9 @@ Test script for patient manager functions (no API key required).
 import random
 from synthetic_datagen.generation.profile_generation import sample_patient_profile
 from synthetic_datagen.generation.manager_logic import (
+    ConversationTranscript,
     build_patient_manager_input,
+    format_conversation_context,
     parse_patient_manager_output,
 )
 
@@ -57,7 +59,7 @@ patient_meta = {
 pm_input = build_patient_manager_input(
     last_doctor_message="Over the past two weeks, how often have you felt down?",
     last_doctor_move="DSM",
-    conversation_history=dummy_conversation,
+    conversation_context=format_conversation_context(dummy_conversation),
     patient_meta=patient_meta,
     depression_profile=depression_profile,
     disclosure_state=disclosure_state,
@@ -68,8 +70,26 @@ print(f"   Input length: {len(pm_input)} characters")
 print(f"   Contains disclosure_state: {'disclosure_state' in pm_input}")
 print(f"   Contains depression profile: {'Depressed mood' in pm_input}")
 
+# Test incremental transcript rendering
+print("\n3. Testing ConversationTranscript.render():")
+
+transcript = ConversationTranscript()
+growing_conversation = []
+assert transcript.render(growing_conversation) == format_conversation_context(growing_conversation)
+for msg in dummy_conversation + [
+    {"role": "assistant", "content": "Over the past two weeks, how often have you felt down?"},
+    {"role": "user", "content": "Most days, honestly."},
+]:
+    growing_conversation.append(msg)
+    assert transcript.render(growing_conversation) == format_conversation_context(growing_conversation)
+    # Rendering again without new messages returns the same text
+    assert transcript.render(growing_conversation) == format_conversation_context(growing_conversation)
+
+print("   ✓ Matches format_conversation_context() as messages are appended")
+print(f"   Messages rendered: {len(growing_conversation)}")
+
 # Test parse_patient_manager_output with valid JSON
-print("\n3. Testing parse_patient_manager_output() with valid JSON:")
+print("\n4. Testing parse_patient_manager_output() with valid JSON:")
 
 valid_json = """{
   "directness": "MED",
@@ -94,7 +114,7 @@ print(f"   Length: {guidance['target_length']}")
 print(f"   Tone tags: {guidance['tone_tags']}")
 
 # Test parse_patient_manager_output with invalid JSON (fallback)
-print("\n4. Testing parse_patient_manager_output() with invalid JSON (fallback):")
+print("\n5. Testing parse_patient_manager_output() with invalid JSON (fallback):")
 
 invalid_json = "This is not valid JSON at all!"
 
@@ -111,7 +131,7 @@ print(f"   Length: {guidance_fallback['target_length']}")
 print(f"   Has response_instruction: {'response_instruction' in guidance_fallback}")
 
 # Test parse with markdown code fences
-print("\n5. Testing parse_patient_manager_output() with markdown fences:")
+print("\n6. Testing parse_patient_manager_output() with markdown fences:")
 
 markdown_json = """```json
 {
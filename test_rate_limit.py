@@ -0,0 +1,145 @@
+"""
+Test script for the shared rate limiter and run_agent retries (no API key required).
+"""
+import asyncio
+import time
+
+import httpx
+from openai import RateLimitError
+
+from synthetic_datagen import config
+from synthetic_datagen.utils import rate_limit
+from synthetic_datagen.utils.rate_limit import RateLimiter, run_agent
+
+print("=" * 60)
+print("Testing Rate Limiter and run_agent Retries")
+print("=" * 60)
+
+
+def make_rate_limit_error() -> RateLimitError:
+    """Build a RateLimitError as the OpenAI client would raise it for a 429."""
+    request = httpx.Request("POST", "https://api.openai.com/v1/responses")
+    return RateLimitError("rate limited", response=httpx.Response(429, request=request), body=None)
+
+
+class FakeAgent:
+    """Minimal stand-in for an Agent (only what estimate_request_tokens reads)."""
+    instructions = "You are a test agent."
+    model_settings = None
+
+
+# Test _refill
+print("\n1. Testing RateLimiter._refill():")
+
+limiter = RateLimiter(max_requests_per_minute=60, max_tokens_per_minute=6000)
+limiter.available_requests = 0
+limiter.available_tokens = 0
+limiter._last_update = time.monotonic() - 30  # pretend 30s have passed
+limiter._refill()
+assert 29 <= limiter.available_requests <= 31, limiter.available_requests
+assert 2900 <= limiter.available_tokens <= 3100, limiter.available_tokens
+
+limiter._last_update = time.monotonic() - 600  # far more than a minute
+limiter._refill()
+assert limiter.available_requests == 60
+assert limiter.available_tokens == 6000
+
+print("   ✓ Capacity refills in proportion to elapsed time")
+print("   ✓ Capacity is capped at the per-minute limits")
+
+# Test acquire
+print("\n2. Testing RateLimiter.acquire():")
+
+
+async def check_acquire():
+    # Consumes one request and the requested tokens when capacity is available
+    limiter = RateLimiter(max_requests_per_minute=60, max_tokens_per_minute=6000)
+    await limiter.acquire(1000)
+    assert 58.9 < limiter.available_requests < 59.1, limiter.available_requests
+    assert 4999 < limiter.available_tokens < 5001, limiter.available_tokens
+
+    # Waits for the request bucket to refill instead of overdrawing it
+    # (6000 RPM refills one request every 10ms)
+    limiter = RateLimiter(max_requests_per_minute=6000, max_tokens_per_minute=6000)
+    limiter.available_requests = 0
+    start = time.monotonic()
+    await asyncio.wait_for(limiter.acquire(10), timeout=2)
+    assert time.monotonic() - start >= 0.005
+    assert limiter.available_requests >= 0
+
+    # A request larger than the whole per-minute token budget is capped to it
+    # rather than waiting forever for capacity the bucket can never hold
+    limiter = RateLimiter(max_requests_per_minute=60, max_tokens_per_minute=100)
+    await asyncio.wait_for(limiter.acquire(10_000), timeout=2)
+    assert limiter.available_tokens < 1, limiter.available_tokens
+
+asyncio.run(check_acquire())
+
+print("   ✓ Consumes one request and the requested tokens")
+print("   ✓ Waits for capacity to refill when a bucket is empty")
+print("   ✓ Oversized requests are capped to the bucket size (no deadlock)")
+
+# Test run_agent retries with a fake Runner.run
+print("\n3. Testing run_agent() retry and backoff:")
+
+original_runner_run = rate_limit.Runner.run
+original_get_client = rate_limit.get_openai_client
+original_sleep = asyncio.sleep
+
+
+async def check_run_agent(failures: int):
+    """Run run_agent against a Runner.run that raises RateLimitError `failures` times."""
+    calls = []
+    sleeps = []
+
+    async def fake_run(agent, agent_input, **kwargs):
+        calls.append(kwargs)
+        if len(calls) <= failures:
+            raise make_rate_limit_error()
+        return "RESULT"
+
+    async def fake_sleep(delay, *args, **kwargs):
+        # Record backoff delays; keep the limiter's short polling sleeps real
+        if delay >= 1:
+            sleeps.append(delay)
+            delay = 0
+        return await original_sleep(delay, *args, **kwargs)
+
+    rate_limit.Runner.run = fake_run
+    rate_limit.get_openai_client = lambda: None
+    rate_limit._rate_limiter = RateLimiter(10_000, 10_000_000)
+    asyncio.sleep = fake_sleep
+    try:
+        try:
+            result = await run_agent(FakeAgent(), "hello", previous_response_id="resp_1")
+        except RateLimitError as e:
+            result = e
+    finally:
+        rate_limit.Runner.run = original_runner_run
+        rate_limit.get_openai_client = original_get_client
+        rate_limit._rate_limiter = None
+        asyncio.sleep = original_sleep
+    return result, calls, sleeps
+
+max_attempts = config.RATE_LIMIT_MAX_ATTEMPTS
+
+# Succeeds after two rate-limit errors, backing off 1s then 2s
+result, calls, sleeps = asyncio.run(check_run_agent(failures=2))
+assert result == "RESULT", result
+assert len(calls) == 3, calls
+assert sleeps == [1, 2], sleeps
+assert all(kwargs["previous_response_id"] == "resp_1" for kwargs in calls)
+print("   ✓ Retries transient errors and returns the eventual result")
+print(f"   Backoff delays: {sleeps}")
+
+# Gives up after RATE_LIMIT_MAX_ATTEMPTS and re-raises the last error
+result, calls, sleeps = asyncio.run(check_run_agent(failures=max_attempts))
+assert isinstance(result, RateLimitError), result
+assert len(calls) == max_attempts, calls
+assert sleeps == [2 ** attempt for attempt in range(max_attempts - 1)], sleeps
+print(f"   ✓ Re-raises RateLimitError after {max_attempts} attempts")
+print(f"   Backoff delays: {sleeps}")
+
+print("\n" + "=" * 60)
+print("✓ All Rate Limiter Tests Passed!")
+print("=" * 60)